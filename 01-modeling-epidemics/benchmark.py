@@ -0,0 +1,260 @@
+'''
+Epidemic modelling benchmarks
+
+Times run_simulation, vaccinate_and_simulate and run_trials on
+synthetic ring cities and reports throughput in person-days per second
+(people in the city times days simulated, per second of wall time).
+
+Results can be saved as a baseline and later runs compared against it,
+so that slowdowns in the hot path are caught.
+
+Example use:
+    $ python3 benchmark.py --sizes 1000,100000 --save-baseline base.json
+    $ python3 benchmark.py --sizes 1000,100000 --compare base.json
+'''
+
+import json
+import random
+import sys
+import time
+import click
+
+import sir
+
+# Seed used to generate the synthetic cities, so that every run of the
+# benchmarks simulates the same cities.
+CITY_SEED = 20170217
+
+
+def make_city(size, infected_density, random_seed, eagerness=None):
+    '''
+    Generate a synthetic ring city.
+
+    Args:
+        size (int): the number of people in the city
+        infected_density (float): the probability that a person starts
+          out infected.  At least one person is always infected.
+        random_seed (int): the seed for the random number generator
+        eagerness (float): if not None, generate vax tuples where every
+          person has this eagerness to be vaccinated
+
+    Returns (list of tuples): person tuples, or vax tuples if eagerness
+      is given.
+    '''
+
+    rng = random.Random(random_seed)
+    city = [('I', 0) if rng.random() < infected_density else ('S', 0)
+            for _ in range(size)]
+    city[rng.randrange(size)] = ('I', 0)
+
+    if eagerness is not None:
+        return [(ds, d, eagerness) for ds, d in city]
+    return city
+
+
+def time_call(func, args, repeat):
+    '''
+    Time a function call.
+
+    Args:
+        func (function): the function to call
+        args (tuple): the arguments for the call
+        repeat (int): the number of times to make the call
+
+    Returns (float, value): the fastest time in seconds and the value
+      returned by the last call.
+    '''
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rv = func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best, rv
+
+
+def run_benchmarks(sizes, densities, days_contagious_values, engines,
+                   num_trials, repeat):
+    '''
+    Run every benchmark on every combination of the parameters.
+
+    Args:
+        sizes (list of ints): the city sizes
+        densities (list of floats): the initial infection densities
+        days_contagious_values (list of ints): the numbers of days a
+          person is infected
+        engines (list of strings): the simulation engines to time
+        num_trials (int): the number of trials for run_trials
+        repeat (int): the number of times to time each call
+
+    Returns (list of dictionaries): one result per benchmark, with the
+      benchmark name, its parameters, the time in seconds and the
+      throughput in person-days per second.
+    '''
+
+    results = []
+
+    for size in sizes:
+        for density in densities:
+            city = make_city(size, density, CITY_SEED)
+            vax_city = make_city(size, density, CITY_SEED, eagerness=0.1)
+
+            for days_contagious in days_contagious_values:
+                for engine in engines:
+                    benchmarks = [
+                        ("run_simulation", sir.run_simulation,
+                         (city, days_contagious, engine), 1),
+                        ("vaccinate_and_simulate", sir.vaccinate_and_simulate,
+                         (vax_city, days_contagious, CITY_SEED, engine), 1),
+                        ("run_trials", sir.run_trials,
+                         (vax_city, days_contagious, CITY_SEED, num_trials,
+                          1, engine), num_trials),
+                    ]
+
+                    for name, func, args, runs in benchmarks:
+                        seconds, rv = time_call(func, args, repeat)
+                        # run_trials only returns the median number of days.
+                        days = rv if isinstance(rv, int) else rv[1]
+                        person_days = size * max(days, 1) * runs
+                        result = {"benchmark": name,
+                                  "engine": engine,
+                                  "size": size,
+                                  "density": density,
+                                  "days_contagious": days_contagious,
+                                  "days": days,
+                                  "seconds": seconds,
+                                  "person_days_per_second":
+                                      person_days / seconds}
+                        results.append(result)
+                        print_result(result)
+
+    return results
+
+
+def result_key(result):
+    '''
+    Identify a benchmark by its name and parameters.
+
+    Args:
+        result (dictionary): a benchmark result
+
+    Returns (tuple): the key
+    '''
+
+    return (result["benchmark"], result["engine"], result["size"],
+            result["density"], result["days_contagious"])
+
+
+def print_result(result):
+    '''
+    Print a single benchmark result.
+
+    Args:
+        result (dictionary): a benchmark result
+    '''
+
+    print("{:<24} {:<9} N={:<9} density={:<7} days_contagious={:<3} "
+          "{:>10.4f}s {:>14,.0f} person-days/s".format(
+              result["benchmark"], result["engine"], result["size"],
+              result["density"], result["days_contagious"],
+              result["seconds"], result["person_days_per_second"]))
+
+
+def find_regressions(results, baseline, tolerance):
+    '''
+    Compare benchmark results with a baseline.
+
+    Args:
+        results (list of dictionaries): the benchmark results
+        baseline (list of dictionaries): the baseline results
+        tolerance (float): the fraction of the baseline throughput that
+          may be lost before a benchmark counts as a regression
+
+    Returns (list of (dictionary, dictionary) tuples): the result and
+      baseline of every benchmark that regressed.
+    '''
+
+    baseline = {result_key(result): result for result in baseline}
+    regressions = []
+
+    for result in results:
+        base = baseline.get(result_key(result))
+        if base is None:
+            continue
+        if result["person_days_per_second"] < \
+           (1 - tolerance) * base["person_days_per_second"]:
+            regressions.append((result, base))
+
+    return regressions
+
+
+def parse_list(value, convert):
+    '''
+    Parse a comma-separated command-line option.
+
+    Args:
+        value (string): the option value
+        convert (function): converts each element
+
+    Returns (list): the converted elements
+    '''
+
+    return [convert(v) for v in value.split(",")]
+
+
+@click.command()
+@click.option("--sizes", default="1000,10000,100000",
+              help="Comma-separated city sizes, e.g. 1e3,1e7")
+@click.option("--densities", default="0.001,0.01",
+              help="Comma-separated initial infection densities")
+@click.option("--days-contagious", default="2,5",
+              help="Comma-separated numbers of days contagious")
+@click.option("--engines", default=",".join(sir.ENGINES),
+              help="Comma-separated simulation engines")
+@click.option("--num-trials", default=5, type=int)
+@click.option("--repeat", default=3, type=int,
+              help="Time each call this many times and keep the fastest")
+@click.option("--save-baseline", default=None, type=str,
+              help="Save the results to this JSON file")
+@click.option("--compare", default=None, type=str,
+              help="Compare the results with this baseline JSON file")
+@click.option("--tolerance", default=0.2, type=float,
+              help="Allowed loss of throughput relative to the baseline")
+def cmd(sizes, densities, days_contagious, engines, num_trials, repeat,
+        save_baseline, compare, tolerance):
+    '''
+    Run the benchmarks.
+    '''
+    # Allow sizes in scientific notation, such as 1e6.
+    results = run_benchmarks(parse_list(sizes, lambda v: int(float(v))),
+                             parse_list(densities, float),
+                             parse_list(days_contagious, int),
+                             parse_list(engines, str),
+                             num_trials, repeat)
+
+    if save_baseline:
+        with open(save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Saved baseline to", save_baseline)
+
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, tolerance)
+        for result, base in regressions:
+            print("Regression: {} {} N={} density={} days_contagious={}: "
+                  "{:,.0f} person-days/s, baseline {:,.0f}".format(
+                      result["benchmark"], result["engine"], result["size"],
+                      result["density"], result["days_contagious"],
+                      result["person_days_per_second"],
+                      base["person_days_per_second"]), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against", compare)
+
+
+if __name__ == "__main__":
+    cmd()  # pylint: disable=no-value-for-parameter
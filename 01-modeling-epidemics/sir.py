@@ -6,14 +6,37 @@ Gabriela Ayala
 Functions for running a simple epidemiological simulation
 '''
 
+import contextlib
+import csv
+import functools
+import hashlib
+import math
+import mmap
+import os
 import random
+import statistics
+import struct
 import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import click
+import numpy as np
 
 # This seed should be used for debugging purposes only!  Do not refer
 # to this variable in your code.
 TEST_SEED = 20170217
 
+# Disease states in the order used for their integer codes in the
+# array-based engines.
+DISEASE_STATES = ('S', 'I', 'R', 'V')
+SUSCEPTIBLE, INFECTED, RECOVERED, VACCINATED = range(len(DISEASE_STATES))
+STATE_CODES = {ds: code for code, ds in enumerate(DISEASE_STATES)}
+
+# Simulation engines that run_simulation knows how to use.
+ENGINES = ('tuple', 'numpy', 'frontier', 'compact', 'chunked', 'runs')
+
 def has_an_infected_neighbor(city, location):
     '''
     Determine whether a person at a specific location has an infected
@@ -89,7 +112,97 @@ def advance_person_at_location(city, location, days_contagious):
     return location
    
 
-def simulate_one_day(starting_city, days_contagious):
+class TimeSeriesRecorder:
+    '''
+    Class for recording the number of people in each disease state at
+    the end of every simulated day.
+
+    The counts are only taken from the city once, by start().  After
+    that the simulation reports how many people were infected and how
+    many recovered each day, which are the only changes of state in the
+    model, so recording a day costs O(1) however large the city is.
+
+    Methods:
+        start(counts):
+            record the counts for the starting city
+        record_day(infections, recoveries):
+            record the counts at the end of a day
+        time_series(): array
+            the counts for each day so far
+    '''
+
+    __slots__ = ('_counts', '_series')
+
+    def __init__(self):
+        '''
+        Construct an empty recorder.
+        '''
+        self._counts = None
+        self._series = array('q')
+
+    def start(self, counts):
+        '''
+        Record the counts for the starting city (day 0).
+
+        Args:
+            counts (list of ints): the number of people in each disease
+              state, in the order of DISEASE_STATES (see count_states)
+        '''
+        assert len(counts) == len(DISEASE_STATES)
+
+        self._counts = [int(count) for count in counts]
+        self._series = array('q', self._counts)
+
+    def record_day(self, infections, recoveries):
+        '''
+        Record the counts at the end of a day.
+
+        Args:
+            infections (int): the number of people infected that day
+            recoveries (int): the number of people who recovered that day
+        '''
+        assert self._counts is not None, "The recorder has not been started"
+
+        counts = self._counts
+        counts[SUSCEPTIBLE] -= infections
+        counts[INFECTED] += infections - recoveries
+        counts[RECOVERED] += recoveries
+        self._series.extend(counts)
+
+    def time_series(self):
+        '''
+        Get the counts for each day recorded so far.
+
+        Returns (2-D array of ints): one row per day, starting with
+          day 0, and one column per disease state in the order of
+          DISEASE_STATES.
+        '''
+        return np.array(self._series, dtype=np.int64).reshape(
+            -1, len(DISEASE_STATES))
+
+
+def count_states(city):
+    '''
+    Count the people in each disease state.
+
+    Args:
+        city (list of tuples): the state of all people in the city
+
+    Returns (list of ints): the number of people in each disease state,
+      in the order of DISEASE_STATES.
+    '''
+
+    if isinstance(city, RunLengthCity):
+        return city.count_states()
+
+    counts = [0] * len(DISEASE_STATES)
+    for ds, _ in city:
+        counts[STATE_CODES[ds]] += 1
+
+    return counts
+
+
+def simulate_one_day(starting_city, days_contagious, recorder=None):
     '''
     Move the simulation forward a single day.
 
@@ -97,19 +210,102 @@ def simulate_one_day(starting_city, days_contagious):
         starting_city (list): the state of all people in the simulation at the
           start of the day
         days_contagious (int): the number of a days a person is infected
+        recorder (TimeSeriesRecorder): an optional, started recorder
+          for the day's counts
 
-    Returns (list of tuples): the state of the city after one day
+    Returns (list of tuples): the state of the city after one day.  A
+      RunLengthCity is advanced run by run and a RunLengthCity is
+      returned.
     '''
-    
+
+    if isinstance(starting_city, RunLengthCity):
+        return starting_city.next_day(days_contagious, recorder)
+
     # Allocate space to hold the list of the new city state.
     new_city = []
+    infections = 0
+    recoveries = 0
 
-    for location, _ in enumerate(starting_city):
-        new_city.append(advance_person_at_location(starting_city, location, 
-                                                   days_contagious))
+    for location, (ds, _) in enumerate(starting_city):
+        person = advance_person_at_location(starting_city, location,
+                                            days_contagious)
+        if ds == 'S' and person[0] == 'I':
+            infections += 1
+        elif ds == 'I' and person[0] == 'R':
+            recoveries += 1
+        new_city.append(person)
+
+    if recorder is not None:
+        recorder.record_day(infections, recoveries)
 
     return new_city
 
+def simulate_one_day_fused(starting_city, days_contagious, recorder=None):
+    '''
+    Move the simulation forward a single day and, in the same pass,
+    determine whether transmission is possible in the new city.
+
+    Equivalent to simulate_one_day followed by is_transmission_possible
+    on its result, but walks the city only once: each person's new
+    state is compared with the new state of their left neighbor as soon
+    as it is computed.
+
+    Args:
+        starting_city (list): the state of all people in the simulation at the
+          start of the day
+        days_contagious (int): the number of a days a person is infected
+        recorder (TimeSeriesRecorder): an optional, started recorder
+          for the day's counts
+
+    Returns tuple (list of tuples, boolean): the state of the city after
+      one day and whether transmission is possible in that city.
+    '''
+
+    size = len(starting_city)
+    new_city = []
+    transmission_possible = False
+    left_ds = None
+    infections = 0
+    recoveries = 0
+
+    for location, (ds, d) in enumerate(starting_city):
+        if ds == 'S':
+            if starting_city[location - 1][0] == 'I' or \
+               starting_city[(location + 1) % size][0] == 'I':
+                person = ('I', 0)
+                infections += 1
+            else:
+                person = ('S', d + 1)
+        elif ds == 'I':
+            if d + 1 < days_contagious:
+                person = ('I', d + 1)
+            else:
+                person = ('R', 0)
+                recoveries += 1
+        else:
+            person = (ds, d + 1)
+
+        new_ds = person[0]
+        if (new_ds == 'S' and left_ds == 'I') or \
+           (new_ds == 'I' and left_ds == 'S'):
+            transmission_possible = True
+
+        new_city.append(person)
+        left_ds = new_ds
+
+    # Close the ring: the last person is the left neighbor of the first.
+    if size > 1:
+        first_ds = new_city[0][0]
+        if (first_ds == 'S' and left_ds == 'I') or \
+           (first_ds == 'I' and left_ds == 'S'):
+            transmission_possible = True
+
+    if recorder is not None:
+        recorder.record_day(infections, recoveries)
+
+    return new_city, transmission_possible
+
+
 def is_transmission_possible(city):
     """
     Is there at least one susceptible person who has an infected neighbor?
@@ -120,7 +316,10 @@ def is_transmission_possible(city):
     Returns (boolean): True if the city has at least one susceptible person
         with an infected neighbor, False otherwise.
     """
-    
+
+    if isinstance(city, RunLengthCity):
+        return city.is_transmission_possible()
+
     transmission_possible = False
 
     for location, (ds, d) in enumerate(city):
@@ -132,231 +331,2590 @@ def is_transmission_possible(city):
     return transmission_possible
 
 
-def run_simulation(starting_city, days_contagious):
+def predict_days(city):
     '''
-    Run the entire simulation
+    Compute the number of days run_simulation would simulate, without
+    simulating.
+
+    A person who is infected at the start of a day always infects their
+    susceptible neighbors that day, whatever their day count, so the
+    infection moves one location per day into every run of susceptible
+    people next to an infected person and stops at anyone who is not
+    susceptible.  A run of length L with an infected person on one side
+    takes L days to infect and one with infected people on both sides
+    takes ceil(L / 2) days; the simulation lasts as long as the slowest
+    run.  The result does not depend on the number of days contagious.
 
     Args:
-        starting_city (list): the state of all people in the city at the
+        city (list of tuples or RunLengthCity): the state of all people
+          in the city at the start of the simulation
+
+    Returns (int): the number of days until transmission stops
+    '''
+
+    if isinstance(city, RunLengthCity):
+        city = city.to_tuples()
+
+    size = len(city)
+
+    # Start the scan just after someone who is not susceptible, so
+    # that no run of susceptible people wraps around the ring.
+    start = next((location for location, (ds, _) in enumerate(city)
+                  if ds != 'S'), None)
+    if start is None:
+        return 0
+
+    days = 0
+    run_length = 0
+    left_ds = city[start][0]
+
+    for offset in range(1, size + 1):
+        ds, _ = city[(start + offset) % size]
+        if ds == 'S':
+            run_length += 1
+            continue
+
+        infected_sides = (left_ds == 'I') + (ds == 'I')
+        if infected_sides == 2:
+            days = max(days, (run_length + 1) // 2)
+        elif infected_sides == 1:
+            days = max(days, run_length)
+
+        run_length = 0
+        left_ds = ds
+
+    return days
+
+
+def city_to_arrays(city):
+    '''
+    Convert a city of person tuples into NumPy arrays.
+
+    Args:
+        city (list of tuples): the state of all people in the city
+
+    Returns (tuple of arrays): an array of disease state codes (uint8)
+      and an array with the number of days each person has been in
+      that state (int64).
+    '''
+
+    states = np.fromiter((STATE_CODES[ds] for ds, _ in city), dtype=np.uint8,
+                         count=len(city))
+    days = np.fromiter((d for _, d in city), dtype=np.int64,
+                       count=len(city))
+
+    return states, days
+
+
+def arrays_to_city(states, days):
+    '''
+    Convert the NumPy representation of a city back into person tuples.
+
+    Args:
+        states (array): the disease state code of each person
+        days (array): the number of days each person has been in that
+          state
+
+    Returns (list of tuples): the state of all people in the city
+    '''
+
+    return [(DISEASE_STATES[code], d)
+            for code, d in zip(states.tolist(), days.tolist())]
+
+
+def infected_neighbor_mask(states, graph=None):
+    '''
+    Find every person with an infected neighbor.
+
+    Args:
+        states (array): the disease state code of each person.  For a
+          2-D array, each row is a separate city.
+        graph (ContactGraph): who is in contact with whom.  Defaults to
+          the ring, where the neighbors are found by shifting the
+          array.
+
+    Returns (array of booleans): True at the locations with an infected
+      neighbor.
+    '''
+
+    infected = states == INFECTED
+
+    if graph is not None:
+        return graph.has_neighbor(infected)
+
+    return np.roll(infected, 1, axis=-1) | np.roll(infected, -1, axis=-1)
+
+
+def simulate_one_day_arrays(states, days, days_contagious, recorder=None,
+                            graph=None):
+    '''
+    Move the array representation of the simulation forward a single
+    day.  Equivalent to simulate_one_day.
+
+    Args:
+        states (array): the disease state code of each person at the
+          start of the day
+        days (array): the number of days each person has been in that
+          state at the start of the day
+        days_contagious (int): the number of a days a person is infected
+        recorder (TimeSeriesRecorder): an optional, started recorder
+          for the day's counts
+        graph (ContactGraph): who is in contact with whom (defaults to
+          the ring)
+
+    Returns (tuple of arrays): the disease state codes and day counts
+      after one day.
+    '''
+
+    newly_infected = (states == SUSCEPTIBLE) & \
+        infected_neighbor_mask(states, graph)
+    newly_recovered = (states == INFECTED) & (days + 1 >= days_contagious)
+
+    new_states = states.copy()
+    new_states[newly_infected] = INFECTED
+    new_states[newly_recovered] = RECOVERED
+
+    new_days = days + 1
+    new_days[newly_infected | newly_recovered] = 0
+
+    if recorder is not None:
+        recorder.record_day(int(np.count_nonzero(newly_infected)),
+                            int(np.count_nonzero(newly_recovered)))
+
+    return new_states, new_days
+
+
+def is_transmission_possible_arrays(states, graph=None):
+    '''
+    Is there at least one susceptible person who has an infected
+    neighbor?  Equivalent to is_transmission_possible.
+
+    Args:
+        states (array): the disease state code of each person
+        graph (ContactGraph): who is in contact with whom (defaults to
+          the ring)
+
+    Returns (boolean): True if the city has at least one susceptible
+      person with an infected neighbor, False otherwise.
+    '''
+
+    return bool(np.any((states == SUSCEPTIBLE) &
+                       infected_neighbor_mask(states, graph)))
+
+
+def transmission_possible_rows(states, graph=None):
+    '''
+    Is transmission possible in each city of a batch?
+
+    Args:
+        states (2-D array): the disease state codes, one city per row
+        graph (ContactGraph): who is in contact with whom (defaults to
+          the ring)
+
+    Returns (array of booleans): True for the rows with at least one
+      susceptible person who has an infected neighbor.
+    '''
+
+    return np.any((states == SUSCEPTIBLE) &
+                  infected_neighbor_mask(states, graph), axis=-1)
+
+
+def run_simulation_arrays(states, days, days_contagious, recorder=None,
+                          graph=None):
+    '''
+    Run the entire simulation on the array representation of a city.
+
+    Args:
+        states (array): the disease state code of each person at the
           start of the simulation
+        days (array): the number of days each person has been in that
+          state at the start of the simulation
         days_contagious (int): the number of a days a person is infected
+        recorder (TimeSeriesRecorder): an optional, started recorder
+          for the daily counts
+        graph (ContactGraph): who is in contact with whom (defaults to
+          the ring)
 
-    Returns tuple (list of tuples, int): the final state of the city
-      and the number of days actually simulated.
+    Returns tuple (array, array, int): the final disease state codes,
+      the final day counts and the number of days actually simulated.
     '''
-    
-    # Initialize at 0 the counter of days passed in the simulation.
+
     days_passed = 0
 
-    while is_transmission_possible(starting_city):
+    while is_transmission_possible_arrays(states, graph):
         days_passed += 1
-        starting_city = (simulate_one_day(starting_city, days_contagious))
-      
-    return starting_city, days_passed
+        states, days = simulate_one_day_arrays(states, days, days_contagious,
+                                               recorder, graph)
+
+    return states, days, days_passed
 
 
-def vaccinate_person(vax_tuple):
+def susceptible_frontier(states, infected):
     '''
-    Attempt to vaccinate a single person based on their current
-    disease state and personal eagerness to be vaccinated.
+    Find the susceptible people who have an infected neighbor.
 
     Args:
-        vax_tuple (string, int, float): information about a person,
-          including their eagerness to be vaccinated.
+        states (list of strings): the disease state of each person
+        infected (set of ints): the locations of the infected people
 
-    Returns (string, int): a person tuple
+    Returns (set of ints): the locations of the susceptible people next
+      to an infected person.
     '''
 
-    ds, d, e = vax_tuple
-    # Allocate space for the new person_tuple.
-    person_tuple = ()
+    size = len(states)
+    frontier = set()
 
-    # A susceptible person is vaccinated only when the random number 
-    # generated is strictly less than the eagerness to get vaccinated.
-    if ds == 'S' and random.random() < e:
-        person_tuple = ('V', 0)
-    else:
-        person_tuple = (ds, d)
+    for location in infected:
+        for neighbor in ((location - 1) % size, (location + 1) % size):
+            if states[neighbor] == 'S':
+                frontier.add(neighbor)
 
-    return person_tuple
+    return frontier
 
 
-def vaccinate_city(city_vax_tuples, random_seed):
+def run_simulation_frontier(starting_city, days_contagious, recorder=None):
     '''
-    Vaccinate the people in the city based on their current state and
-    eagerness to be vaccinated.
+    Run the entire simulation touching only the active locations
+    (infected people and their susceptible neighbors) each day.
+    Equivalent to running simulate_one_day until transmission stops.
+
+    Day counts are updated lazily: a person's count is stored along
+    with the day on which it was last written, and everyone else's
+    count is brought up to date once at the end of the simulation.
 
     Args:
-        city_vax_tuples (list of (string, int, float) triples):
-          state of all people in the simulation at the start
-          of the simulation, including their eagerness to be vaccinated.
-        random_seed (int): seed for the random number generator
+        starting_city (list): the state of all people in the city at the
+          start of the simulation
+        days_contagious (int): the number of a days a person is infected
+        recorder (TimeSeriesRecorder): an optional, started recorder
+          for the daily counts
 
-    Returns (list of (string, int) tuples): state of the people in the
-      city after vaccination
+    Returns tuple (list of tuples, int): the final state of the city
+      and the number of days actually simulated.
     '''
-    
-    # Allocate space for the list of tuples of the people in the city
-    #after the vaccination.
-    new_city_tuples = []
 
-    # Set random seed.
-    random.seed(random_seed)
+    states = [ds for ds, _ in starting_city]
+    days = [d for _, d in starting_city]
+    # The simulation day on which each entry in days was written.
+    written = [0] * len(starting_city)
 
-    for vax_tuple in city_vax_tuples:
-        new_city_tuples.append(vaccinate_person(vax_tuple))
-        
-    return new_city_tuples
+    infected = {location for location, ds in enumerate(states) if ds == 'I'}
+    frontier = susceptible_frontier(states, infected)
+    days_passed = 0
+
+    while frontier:
+        days_passed += 1
+
+        recovered = [location for location in infected
+                     if days[location] + days_passed - written[location]
+                     >= days_contagious]
+        for location in recovered:
+            states[location] = 'R'
+            days[location] = 0
+            written[location] = days_passed
+            infected.remove(location)
+
+        for location in frontier:
+            states[location] = 'I'
+            days[location] = 0
+            written[location] = days_passed
+            infected.add(location)
+
+        if recorder is not None:
+            recorder.record_day(len(frontier), len(recovered))
+
+        frontier = susceptible_frontier(states, infected)
+
+    final_city = [(ds, d + days_passed - w)
+                  for ds, d, w in zip(states, days, written)]
+
+    return final_city, days_passed
+
+
+class City:
+    '''
+    Class for representing a ring city compactly.
+
+    Disease states are stored as one-byte codes (see DISEASE_STATES) in
+    a bytearray and day counts as unsigned ints in an array('I'), about
+    five bytes per person instead of a tuple per person.  A second pair
+    of buffers holds the next day, and the two are swapped after every
+    step so that no memory is allocated while simulating.
+
+    Attributes:
+        states (bytearray): the disease state code of each person
+        days (array): the number of days each person has been in that
+          state
+
+    Methods:
+        from_tuples(city): City
+            build a compact city from a list of person tuples
+        to_tuples(): list of tuples
+            convert the city back into person tuples
+        count_states(): list of ints
+            the number of people in each disease state
+        is_transmission_possible(): bool
+            is there a susceptible person with an infected neighbor
+        step(days_contagious, recorder): bool
+            advance the city a single day
+        run(days_contagious, recorder): int
+            advance the city until transmission stops
+    '''
+
+    __slots__ = ('states', 'days', '_next_states', '_next_days')
+
+    def __init__(self, states, days):
+        '''
+        Construct a compact city.
+
+        Args:
+            states (bytearray): the disease state code of each person
+            days (array): the number of days each person has been in
+              that state, as an array('I') of the same length
+        '''
+        assert len(states) == len(days), "states and days differ in length"
+
+        self.states = states
+        self.days = days
+        self._next_states = bytearray(len(states))
+        self._next_days = array('I', bytes(days.itemsize * len(days)))
+
+    @classmethod
+    def from_tuples(cls, city):
+        '''
+        Build a compact city from person tuples.
+
+        Args:
+            city (list of tuples): the state of all people in the city
+
+        Returns (City): the compact city
+        '''
+        states = bytearray(STATE_CODES[ds] for ds, _ in city)
+        days = array('I', (d for _, d in city))
+
+        return cls(states, days)
+
+    def to_tuples(self):
+        '''
+        Convert the city back into person tuples.
+
+        Returns (list of tuples): the state of all people in the city
+        '''
+        return [(DISEASE_STATES[code], d)
+                for code, d in zip(self.states, self.days)]
+
+    def __len__(self):
+        return len(self.states)
+
+    def count_states(self):
+        '''
+        Count the people in each disease state.
+
+        Returns (list of ints): the number of people in each disease
+          state, in the order of DISEASE_STATES.
+        '''
+        states = bytes(self.states)
+
+        return [states.count(code) for code in range(len(DISEASE_STATES))]
+
+    def is_transmission_possible(self):
+        '''
+        Is there at least one susceptible person who has an infected
+        neighbor?
+        '''
+        states = self.states
+        size = len(states)
+
+        for location, code in enumerate(states):
+            if code == INFECTED:
+                if states[location - 1] == SUSCEPTIBLE or \
+                   states[(location + 1) % size] == SUSCEPTIBLE:
+                    return True
+
+        return False
+
+    def step(self, days_contagious, recorder=None):
+        '''
+        Advance the city a single day, in a single pass like
+        simulate_one_day_fused.
+
+        Args:
+            days_contagious (int): the number of a days a person is
+              infected
+            recorder (TimeSeriesRecorder): an optional, started
+              recorder for the day's counts
+
+        Returns (boolean): True if transmission is possible in the city
+          after the day, False otherwise.
+        '''
+        states, days = self.states, self.days
+        new_states, new_days = self._next_states, self._next_days
+        size = len(states)
+        transmission_possible = False
+        left_code = None
+        infections = 0
+        recoveries = 0
+
+        for location, code in enumerate(states):
+            if code == SUSCEPTIBLE:
+                if states[location - 1] == INFECTED or \
+                   states[(location + 1) % size] == INFECTED:
+                    code = INFECTED
+                    new_days[location] = 0
+                    infections += 1
+                else:
+                    new_days[location] = days[location] + 1
+            elif code == INFECTED and days[location] + 1 >= days_contagious:
+                code = RECOVERED
+                new_days[location] = 0
+                recoveries += 1
+            else:
+                new_days[location] = days[location] + 1
+            new_states[location] = code
+
+            if (code == SUSCEPTIBLE and left_code == INFECTED) or \
+               (code == INFECTED and left_code == SUSCEPTIBLE):
+                transmission_possible = True
+            left_code = code
+
+        if size > 1:
+            first_code = new_states[0]
+            if (first_code == SUSCEPTIBLE and left_code == INFECTED) or \
+               (first_code == INFECTED and left_code == SUSCEPTIBLE):
+                transmission_possible = True
+
+        # Swap the buffers: today's become the scratch space for tomorrow.
+        self.states, self._next_states = new_states, states
+        self.days, self._next_days = new_days, days
+
+        if recorder is not None:
+            recorder.record_day(infections, recoveries)
+
+        return transmission_possible
+
+    def run(self, days_contagious, recorder=None):
+        '''
+        Advance the city until transmission is no longer possible.
+
+        Args:
+            days_contagious (int): the number of a days a person is
+              infected
+            recorder (TimeSeriesRecorder): an optional, started
+              recorder for the daily counts
+
+        Returns (int): the number of days simulated
+        '''
+        days_passed = 0
+        transmission_possible = self.is_transmission_possible()
+
+        while transmission_possible:
+            days_passed += 1
+            transmission_possible = self.step(days_contagious, recorder)
+
+        return days_passed
+
+
+class RunLengthCity:
+    '''
+    Class for representing a ring city as runs of identical people.
+
+    Neighbors in a run are in the same disease state for the same number
+    of days, so they advance together: a run only splits where a
+    susceptible run touches an infected one, and memory and time per
+    day grow with the number of runs rather than the number of people.
+    Adjacent runs that become identical are merged again.
+
+    Attributes:
+        runs (list of (string, int, int) triples): the disease state,
+          the number of days in that state and the number of people of
+          each run, in order around the ring
+
+    Methods:
+        from_tuples(city): RunLengthCity
+            build a run-length city from a list of person tuples
+        from_arrays(states, days): RunLengthCity
+            build a run-length city from state codes and day counts
+        append(ds, d): add a person at the end of the ring
+        extend_run(ds, d, n): add a run of people at the end of the ring
+        to_tuples(): list of tuples
+            convert the city back into person tuples
+        count_states(): list of ints
+            the number of people in each disease state
+        is_transmission_possible(): bool
+            is there a susceptible person with an infected neighbor
+        next_day(days_contagious, recorder): RunLengthCity
+            the city after a single day
+        run(days_contagious, recorder): (RunLengthCity, int)
+            advance the city until transmission stops
+    '''
+
+    __slots__ = ('runs',)
+
+    def __init__(self, runs=None):
+        '''
+        Construct a run-length city.
+
+        Args:
+            runs (list of (string, int, int) triples): the runs, which
+              must not be empty
+        '''
+        self.runs = [] if runs is None else runs
+
+        assert all(n > 0 for _, _, n in self.runs), "empty run"
+
+    @classmethod
+    def from_tuples(cls, city):
+        '''
+        Build a run-length city from person tuples.
+
+        Args:
+            city (list of tuples): the state of all people in the city
+
+        Returns (RunLengthCity): the run-length city
+        '''
+        rv = cls()
+        for ds, d in city:
+            rv.append(ds, d)
+
+        return rv
+
+    @classmethod
+    def from_arrays(cls, states, days):
+        '''
+        Build a run-length city from disease state codes and day counts,
+        such as those of a City.
+
+        Args:
+            states (bytes-like or array): the disease state codes
+            days (array-like): the number of days in each state
+
+        Returns (RunLengthCity): the run-length city
+        '''
+        states = np.asarray(states, dtype=np.uint8)
+        days = np.asarray(days, dtype=np.int64)
+        if len(states) == 0:
+            return cls()
+
+        starts = np.flatnonzero((states[1:] != states[:-1]) |
+                                (days[1:] != days[:-1])) + 1
+        starts = np.concatenate([[0], starts])
+        lengths = np.diff(np.append(starts, len(states)))
+
+        return cls([(DISEASE_STATES[code], d, n) for code, d, n in
+                    zip(states[starts].tolist(), days[starts].tolist(),
+                        lengths.tolist())])
+
+    def append(self, ds, d):
+        '''
+        Add a person at the end of the ring, extending the last run if
+        they are identical to its people.
+
+        Args:
+            ds (string): the disease state of the person
+            d (int): the number of days the person has been in that state
+        '''
+        self.extend_run(ds, d, 1)
+
+    def extend_run(self, ds, d, n):
+        '''
+        Add a run of identical people at the end of the ring, merging it
+        with the last run if they are identical.
+
+        Args:
+            ds (string): the disease state of the people
+            d (int): the number of days they have been in that state
+            n (int): the number of people
+        '''
+        runs = self.runs
+        if runs and runs[-1][0] == ds and runs[-1][1] == d:
+            runs[-1] = (ds, d, runs[-1][2] + n)
+        else:
+            runs.append((ds, d, n))
+
+    def to_tuples(self):
+        '''
+        Convert the city back into person tuples.
+
+        Returns (list of tuples): the state of all people in the city
+        '''
+        return [(ds, d) for ds, d, n in self.runs for _ in range(n)]
+
+    def __len__(self):
+        return sum(n for _, _, n in self.runs)
+
+    def __iter__(self):
+        for ds, d, n in self.runs:
+            for _ in range(n):
+                yield ds, d
+
+    def count_states(self):
+        '''
+        Count the people in each disease state.
+
+        Returns (list of ints): the number of people in each disease
+          state, in the order of DISEASE_STATES.
+        '''
+        counts = [0] * len(DISEASE_STATES)
+        for ds, _, n in self.runs:
+            counts[STATE_CODES[ds]] += n
+
+        return counts
+
+    def _neighbors_infected(self, index):
+        '''
+        Are the people just outside a run infected?
+
+        Args:
+            index (int): the index of the run
+
+        Returns (boolean, boolean): whether the person to the left of
+          the run's first person and the person to the right of its
+          last person are infected
+        '''
+        runs = self.runs
+        if len(runs) == 1:
+            # The run's ends are each other's neighbors.
+            return runs[0][0] == 'I', runs[0][0] == 'I'
+
+        return (runs[index - 1][0] == 'I',
+                runs[(index + 1) % len(runs)][0] == 'I')
+
+    def is_transmission_possible(self):
+        '''
+        Is there at least one susceptible person who has an infected
+        neighbor?
+        '''
+        for index, (ds, _, _) in enumerate(self.runs):
+            if ds == 'S' and any(self._neighbors_infected(index)):
+                return True
 
+        return False
 
-def vaccinate_and_simulate(city_vax_tuples, days_contagious, random_seed):
+    def next_day(self, days_contagious, recorder=None):
+        '''
+        Compute the city after a single day.
+
+        Args:
+            days_contagious (int): the number of a days a person is
+              infected
+            recorder (TimeSeriesRecorder): an optional, started
+              recorder for the day's counts
+
+        Returns (RunLengthCity): the city after the day
+        '''
+        rv = RunLengthCity()
+        infections = 0
+        recoveries = 0
+
+        for index, (ds, d, n) in enumerate(self.runs):
+            if ds == 'S':
+                left, right = self._neighbors_infected(index)
+                # Only the people at the ends of the run can be infected.
+                if n == 1:
+                    left = left or right
+                    right = False
+                if left:
+                    rv.append('I', 0)
+                if n - left - right:
+                    rv.extend_run('S', d + 1, n - left - right)
+                if right:
+                    rv.append('I', 0)
+                infections += left + right
+            elif ds == 'I' and d + 1 >= days_contagious:
+                rv.extend_run('R', 0, n)
+                recoveries += n
+            else:
+                rv.extend_run(ds, d + 1, n)
+
+        if recorder is not None:
+            recorder.record_day(infections, recoveries)
+
+        return rv
+
+    def run(self, days_contagious, recorder=None):
+        '''
+        Advance the city until transmission is no longer possible.
+
+        Args:
+            days_contagious (int): the number of a days a person is
+              infected
+            recorder (TimeSeriesRecorder): an optional, started
+              recorder for the daily counts
+
+        Returns (RunLengthCity, int): the final city and the number of
+          days simulated
+        '''
+        city = self
+        days_passed = 0
+
+        while city.is_transmission_possible():
+            days_passed += 1
+            city = city.next_day(days_contagious, recorder)
+
+        return city, days_passed
+
+
+# Binary city files start with this magic string followed by the number
+# of people as a little-endian uint64.  Then come the disease state codes,
+# one byte per person, zero padding up to a multiple of four bytes and
+# the day counts as little-endian uint32s.
+CITY_FILE_MAGIC = b"SIRCITY\0"
+CITY_FILE_HEADER = struct.Struct("<8sQ")
+
+
+def is_binary_city_file(filename):
     """
-    Vaccinate the city and then simulate the infection spread
+    Does a file hold a city in the binary format?
 
     Args:
-        city_vax_tuples (list): a list with the state of the people in the city,
-            including their eagerness to be vaccinated.
-        days_contagious (int): the number of days a person is infected
-        random_seed (int): the seed for the random number generator
+        filename (string): the name of the file
 
-    Returns (list of tuples, int): the state of the city at the end of the
-      simulation and the number of days simulated.
+    Returns (boolean): True if the file starts with CITY_FILE_MAGIC
     """
-    
-    city_vax_tuples = (vaccinate_city(city_vax_tuples, random_seed))
-
-    city_vax_tuples = run_simulation(city_vax_tuples, days_contagious)
-    
-    return city_vax_tuples
 
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(CITY_FILE_MAGIC)) == CITY_FILE_MAGIC
+    except IOError:
+        return False
 
-################ Do not change the code below this line #######################
 
-def run_trials(vax_city, days_contagious, random_seed, num_trials):
+def write_city(f, city):
     """
-    Run multiple trials of vaccinate_and_simulate and compute the median
-    result for the number of days until infection transmission stops.
+    Write a compact city to an open file in the binary format.
 
     Args:
-        vax_city (list of (string, int, float) triples): a list with vax
-            tuples for the people in the city
-        days_contagious (int): the number of days a person is infected
-        random_seed (int): the seed for the random number generator
-        num_trials (int): the number of trial simulations to run
+        f (file): a file opened for writing in binary mode
+        city (City): the city to write
+    """
 
-    Returns:
-        (int) the median number of days until infection transmission stops
+    size = len(city)
+
+    days = city.days
+    if sys.byteorder != "little":
+        days = array('I', days)
+        days.byteswap()
+
+    f.write(CITY_FILE_HEADER.pack(CITY_FILE_MAGIC, size))
+    f.write(city.states)
+    f.write(bytes(-size % 4))
+    f.write(days)
+
+
+def save_city_file(city, filename):
     """
+    Write a compact city to a file in the binary format.
 
-    days = []
-    for i in range(num_trials):
-        if random_seed:
-            _, num_days_simulated = vaccinate_and_simulate(vax_city,
-                                                           days_contagious,
-                                                           random_seed+i)
-        else:
-            _, num_days_simulated = vaccinate_and_simulate(vax_city,
-                                                           days_contagious,
-                                                           random_seed)
-        days.append(num_days_simulated)
+    Args:
+        city (City): the city to save
+        filename (string): the name of the file
+    """
 
-    # quick way to compute the median
-    return sorted(days)[num_trials // 2]
+    with open(filename, "wb") as f:
+        write_city(f, city)
 
 
-def parse_city_file(filename, is_vax_tuple):
+def map_file(filename):
     """
-    Read a city represented as person tuples or vax tuples from
-    a file.
+    Memory-map a file copy-on-write: pages are read as they are
+    touched, and writes to the mapping never reach the file.
 
     Args:
         filename (string): the name of the file
-        is_vax_tuple (boolean): True if the file is expected to contain
-          (string, int) pairs.  False if the file is expected to contain
-          (string, int, float) triples.
 
-    Returns: list of tuples or None, if the file does not exist or
-      cannot be parsed.
+    Returns (mmap): the mapping, or None if the file cannot be mapped
     """
 
     try:
-        with open(filename) as f:
-            residents = [line.split() for line in f]
-    except IOError:
+        with open(filename, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (IOError, ValueError):
         print("Could not open:", filename, file=sys.stderr)
         return None
 
-    ds_types = ('S', 'I', 'R', 'V')
 
-    rv = []
-    if is_vax_tuple:
-        try:
-            for i, res in enumerate(residents):
-                ds, nd, ve = res
-                num_days = int(nd)
-                vax_eagerness = float(ve)
-                if ds not in ds_types or num_days < 0 or \
-                   vax_eagerness < 0 or vax_eagerness > 1.0:
-                    raise ValueError()
-                rv.append((ds, num_days, vax_eagerness))
-        except ValueError:
-            emsg = ("Error in line {}: vax tuples are represented "
-                    "with a disease state {}"
-                    "a non-negative integer, and a floating point value "
-                    "between 0 and 1.0.")
-            print(emsg.format(i, ds_types), file=sys.stderr)
-            return None
-    else:
-        try:
-            for i, res in enumerate(residents):
-                ds, nd = res
-                num_days = int(nd)
-                if ds not in ds_types or num_days < 0:
-                    raise ValueError()
-                rv.append((ds, num_days))
-        except ValueError:
-            emsg = ("Error in line {}: persons are represented "
-                    "with a disease state {} and a non-negative integer.")
-            print(emsg.format(i, ds_types), file=sys.stderr)
-            return None
-    return rv
+def city_from_buffer(buffer, offset, filename):
+    """
+    Build a City that views a city in the binary format, without
+    copying it.  The city must run to the end of the buffer.
 
+    Args:
+        buffer (mmap): the buffer holding the city
+        offset (int): where the city starts in the buffer
+        filename (string): the name of the file, for error messages
 
-@click.command()
-@click.argument("filename", type=str)
+    Returns (City): the city, or None if the buffer does not hold a
+      valid binary city.
+    """
+
+    header_size = offset + CITY_FILE_HEADER.size
+    if len(buffer) < header_size:
+        print("Not a binary city file:", filename, file=sys.stderr)
+        return None
+
+    magic, size = CITY_FILE_HEADER.unpack_from(buffer, offset)
+    days_offset = header_size + size + (-size % 4)
+    if magic != CITY_FILE_MAGIC or len(buffer) != days_offset + 4 * size:
+        print("Not a binary city file:", filename, file=sys.stderr)
+        return None
+
+    view = memoryview(buffer)
+    states = view[header_size:header_size + size]
+    if size and np.frombuffer(states, dtype=np.uint8).max() >= \
+       len(DISEASE_STATES):
+        print("Invalid disease state in:", filename, file=sys.stderr)
+        return None
+
+    if sys.byteorder == "little":
+        days = view[days_offset:].cast('I')
+    else:
+        # Big-endian hosts need a byte-swapped copy of the day counts.
+        days = array('I')
+        days.frombytes(view[days_offset:])
+        days.byteswap()
+
+    return City(states, days)
+
+
+def load_binary_city_file(filename):
+    """
+    Load a city saved by save_city_file without copying it: the file is
+    memory-mapped copy-on-write and the City's buffers are views of the
+    mapping, so pages are only read (and copied) as the simulation
+    touches them.
+
+    Args:
+        filename (string): the name of the file
+
+    Returns (City): the city, or None if the file cannot be read or is
+      not a valid binary city file.
+    """
+
+    mapping = map_file(filename)
+    if mapping is None:
+        return None
+
+    return city_from_buffer(mapping, 0, filename)
+
+
+def load_city(filename):
+    """
+    Read a city of person tuples from a file directly into a compact
+    City.  Text files are parsed and validated one line at a time, so
+    the file is never held in memory; binary files (see
+    save_city_file) are memory-mapped.
+
+    Args:
+        filename (string): the name of the file
+
+    Returns: City or None, if the file does not exist or cannot be
+      parsed.
+    """
+
+    if is_binary_city_file(filename):
+        return load_binary_city_file(filename)
+
+    states = bytearray()
+    days = array('I')
+
+    try:
+        with open(filename) as f:
+            try:
+                for i, line in enumerate(f):
+                    ds, nd = line.split()
+                    num_days = int(nd)
+                    if ds not in STATE_CODES or num_days < 0:
+                        raise ValueError()
+                    states.append(STATE_CODES[ds])
+                    days.append(num_days)
+            except (ValueError, OverflowError):
+                emsg = ("Error in line {}: persons are represented "
+                        "with a disease state {} and a non-negative "
+                        "integer.")
+                print(emsg.format(i, DISEASE_STATES), file=sys.stderr)
+                return None
+    except IOError:
+        print("Could not open:", filename, file=sys.stderr)
+        return None
+
+    return City(states, days)
+
+
+# Checkpoint files start with this magic string, the number of days
+# simulated so far (uint64) and the number of days contagious (int64),
+# all little-endian, followed by the city in the binary format.
+CHECKPOINT_MAGIC = b"SIRCKPT\0"
+CHECKPOINT_HEADER = struct.Struct("<8sQq")
+
+
+def save_checkpoint(city, days_passed, days_contagious, filename):
+    """
+    Save the state of a simulation atomically: the checkpoint is
+    written to a temporary file next to filename, flushed to disk, and
+    then renamed over filename, so a crash leaves either the old or
+    the new checkpoint, never a partial one.
+
+    Args:
+        city (City): the city
+        days_passed (int): the number of days simulated so far
+        days_contagious (int): the number of a days a person is infected
+        filename (string): the name of the checkpoint file
+    """
+
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, days_passed,
+                                       days_contagious))
+        write_city(f, city)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_filename, filename)
+
+
+def load_checkpoint(filename):
+    """
+    Load a checkpoint saved by save_checkpoint.
+
+    Args:
+        filename (string): the name of the checkpoint file
+
+    Returns (City, int, int): the city, the number of days simulated
+      so far and the number of days contagious, or None if the file
+      cannot be read or is not a valid checkpoint.
+    """
+
+    mapping = map_file(filename)
+    if mapping is None:
+        return None
+
+    if len(mapping) < CHECKPOINT_HEADER.size:
+        print("Not a checkpoint file:", filename, file=sys.stderr)
+        return None
+
+    magic, days_passed, days_contagious = \
+        CHECKPOINT_HEADER.unpack_from(mapping)
+    if magic != CHECKPOINT_MAGIC:
+        print("Not a checkpoint file:", filename, file=sys.stderr)
+        return None
+
+    city = city_from_buffer(mapping, CHECKPOINT_HEADER.size, filename)
+    if city is None:
+        return None
+
+    return city, days_passed, days_contagious
+
+
+def run_with_checkpoints(city, days_contagious, filename, checkpoint_every,
+                         days_passed=0):
+    """
+    Advance a compact city until transmission is no longer possible,
+    like City.run, saving a checkpoint every checkpoint_every days.
+    A simulation resumed from a checkpoint (see load_checkpoint)
+    produces exactly the same city and number of days as an
+    uninterrupted one.
+
+    Args:
+        city (City): the city, advanced in place
+        days_contagious (int): the number of a days a person is infected
+        filename (string): the name of the checkpoint file
+        checkpoint_every (int): the number of days between checkpoints
+        days_passed (int): the number of days already simulated, when
+          resuming
+
+    Returns (int): the total number of days simulated
+    """
+
+    assert checkpoint_every > 0, "checkpoint_every must be positive"
+
+    transmission_possible = city.is_transmission_possible()
+
+    while transmission_possible:
+        days_passed += 1
+        transmission_possible = city.step(days_contagious)
+        if days_passed % checkpoint_every == 0:
+            save_checkpoint(city, days_passed, days_contagious, filename)
+
+    return days_passed
+
+
+def share_arrays(arrays):
+    """
+    Copy arrays into new shared memory blocks.
+
+    Args:
+        arrays (list of arrays): the arrays to share
+
+    Returns (list of SharedMemory, list of tuples): the blocks, which
+      the caller must close and unlink, and a (name, shape, dtype)
+      description of each array for attach_arrays.
+    """
+
+    blocks = []
+    descriptions = []
+    for arr in arrays:
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, arr.dtype, buffer=block.buf)[...] = arr
+        blocks.append(block)
+        descriptions.append((block.name, arr.shape, arr.dtype.str))
+
+    return blocks, descriptions
+
+
+def attach_arrays(descriptions):
+    """
+    View arrays shared by share_arrays, without copying them.
+
+    Args:
+        descriptions (list of tuples): the descriptions from
+          share_arrays
+
+    Returns (list of SharedMemory, list of arrays): the blocks, which
+      must stay open while the arrays are used, and the arrays.
+    """
+
+    blocks = [shared_memory.SharedMemory(name=name)
+              for name, _, _ in descriptions]
+    arrays = [np.ndarray(shape, dtype, buffer=block.buf)
+              for block, (_, shape, dtype) in zip(blocks, descriptions)]
+
+    return blocks, arrays
+
+
+def step_chunk(states, days, new_states, new_days, start, end,
+               days_contagious):
+    '''
+    Advance locations start to end - 1 of a ring city by a single day,
+    like simulate_one_day_arrays.  Only the chunk and one halo location
+    on either side of it are read, and only the chunk is written, so
+    different chunks can be advanced at the same time.
+
+    Args:
+        states (array): the disease state codes of the whole city at the
+          start of the day
+        days (array): the day counts of the whole city at the start of
+          the day
+        new_states (array): where to write the new disease state codes
+        new_days (array): where to write the new day counts
+        start (int): the first location of the chunk
+        end (int): one past the last location of the chunk
+        days_contagious (int): the number of a days a person is infected
+
+    Returns (boolean, int, int): whether transmission is possible
+      between two people inside the chunk after the day, and the number
+      of people infected and recovered.
+    '''
+
+    size = len(states)
+    chunk_states = states[start:end]
+    chunk_days = days[start:end]
+
+    # The chunk's infected people plus the two halo locations.
+    infected = np.empty(end - start + 2, dtype=bool)
+    infected[0] = states[(start - 1) % size] == INFECTED
+    infected[1:-1] = chunk_states == INFECTED
+    infected[-1] = states[end % size] == INFECTED
+
+    newly_infected = (chunk_states == SUSCEPTIBLE) & \
+        (infected[:-2] | infected[2:])
+    newly_recovered = (chunk_states == INFECTED) & \
+        (chunk_days + 1 >= days_contagious)
+
+    out_states = new_states[start:end]
+    out_states[...] = chunk_states
+    out_states[newly_infected] = INFECTED
+    out_states[newly_recovered] = RECOVERED
+
+    out_days = new_days[start:end]
+    np.add(chunk_days, 1, out=out_days)
+    out_days[newly_infected | newly_recovered] = 0
+
+    susceptible = out_states == SUSCEPTIBLE
+    infected = out_states == INFECTED
+    transmission_possible = bool(np.any(
+        (susceptible[:-1] & infected[1:]) | (infected[:-1] & susceptible[1:])))
+
+    return (transmission_possible, int(np.count_nonzero(newly_infected)),
+            int(np.count_nonzero(newly_recovered)))
+
+
+# The city shared by the chunk workers: the shared memory blocks (kept
+# open while the worker runs) and two (states, days) pairs of arrays
+# that view them, which take turns holding the current day.
+_CHUNK_BLOCKS = None
+_CHUNK_ARRAYS = None
+
+
+def _init_chunk_worker(descriptions):
+    """
+    Attach a worker process to the city shared by
+    run_simulation_chunked.
+    """
+
+    global _CHUNK_BLOCKS, _CHUNK_ARRAYS  # pylint: disable=global-statement
+    _CHUNK_BLOCKS, _CHUNK_ARRAYS = attach_arrays(descriptions)
+
+
+def _run_chunk_step(task):
+    """
+    Advance one chunk in a worker process (see step_chunk).
+    """
+
+    parity, start, end, days_contagious = task
+    states, days = _CHUNK_ARRAYS[2 * parity:2 * parity + 2]
+    new_states, new_days = _CHUNK_ARRAYS[2 - 2 * parity:4 - 2 * parity]
+
+    return step_chunk(states, days, new_states, new_days, start, end,
+                      days_contagious)
+
+
+def simulate_one_day_chunked(pool, chunks, buffers, parity, days_contagious):
+    '''
+    Advance a city shared with the chunk workers by a single day, every
+    chunk in parallel.
+
+    Args:
+        pool (ProcessPoolExecutor): the workers, set up with
+          _init_chunk_worker
+        chunks (list of (int, int) pairs): the start and end of each
+          chunk
+        buffers (list of arrays): the two (states, days) pairs shared
+          with the workers
+        parity (int): which pair holds the current day.  The other pair
+          receives the new day.
+        days_contagious (int): the number of a days a person is infected
+
+    Returns (boolean, int, int): whether transmission is possible after
+      the day, and the number of people infected and recovered.
+    '''
+
+    results = list(pool.map(_run_chunk_step,
+                            [(parity, start, end, days_contagious)
+                             for start, end in chunks]))
+    new_states = buffers[2 - 2 * parity]
+
+    # Transmission is possible within a chunk or across the boundary
+    # between two chunks, including the wrap around.
+    transmission_possible = any(
+        possible for possible, _, _ in results) or any(
+            {new_states[start - 1], new_states[start]} ==
+            {SUSCEPTIBLE, INFECTED} for start, _ in chunks)
+
+    return (transmission_possible, sum(r[1] for r in results),
+            sum(r[2] for r in results))
+
+
+def run_simulation_chunked(starting_city, days_contagious, num_workers=None,
+                           recorder=None):
+    '''
+    Run the entire simulation with the ring split into contiguous
+    chunks, one per worker process, that are advanced in parallel every
+    day.  The city lives in shared memory, in two buffers that take
+    turns holding the current day, and each worker reads a one-location
+    halo from its neighbors' chunks.  Gives the same results as
+    run_simulation.
+
+    Args:
+        starting_city (list): the state of all people in the city at the
+          start of the simulation
+        days_contagious (int): the number of a days a person is infected
+        num_workers (int): the number of processes (and chunks).
+          Defaults to the number of CPUs.
+        recorder (TimeSeriesRecorder): an optional, started recorder
+          for the daily counts
+
+    Returns tuple (list of tuples, int): the final state of the city
+      and the number of days actually simulated.
+    '''
+
+    states, days = city_to_arrays(starting_city)
+    if not is_transmission_possible_arrays(states):
+        return arrays_to_city(states, days), 0
+
+    size = len(states)
+    num_chunks = min(num_workers or os.cpu_count() or 1, size)
+    bounds = np.linspace(0, size, num_chunks + 1).astype(int).tolist()
+    chunks = list(zip(bounds[:-1], bounds[1:]))
+
+    blocks, descriptions = share_arrays([states, days, states, days])
+    buffers = [np.ndarray(shape, dtype, buffer=block.buf)
+               for block, (_, shape, dtype) in zip(blocks, descriptions)]
+    days_passed = 0
+    parity = 0
+
+    try:
+        with ProcessPoolExecutor(num_chunks, initializer=_init_chunk_worker,
+                                 initargs=(descriptions,)) as pool:
+            transmission_possible = True
+            while transmission_possible:
+                days_passed += 1
+                transmission_possible, infected, recovered = \
+                    simulate_one_day_chunked(pool, chunks, buffers, parity,
+                                             days_contagious)
+                parity = 1 - parity
+
+                if recorder is not None:
+                    recorder.record_day(infected, recovered)
+
+        final_city = arrays_to_city(buffers[2 * parity],
+                                    buffers[2 * parity + 1])
+    finally:
+        # The views must be gone before the blocks can be closed.
+        buffers.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return final_city, days_passed
+
+
+def run_simulation(starting_city, days_contagious, engine='tuple',
+                   recorder=None, graph=None, num_workers=None):
+    '''
+    Run the entire simulation
+
+    Args:
+        starting_city (list or RunLengthCity): the state of all people in
+          the city at the start of the simulation
+        days_contagious (int): the number of a days a person is infected
+        engine (string): the simulation engine to use, one of ENGINES.
+          'tuple' advances the list of person tuples directly and
+          'numpy' advances the whole ring at once with NumPy arrays.
+          'frontier' only touches the infected people and their
+          susceptible neighbors each day. 'compact' advances a
+          City, which uses a few bytes per person.  'chunked' splits
+          the ring across worker processes.  'runs' advances a
+          RunLengthCity, runs of identical people at a time.  All
+          return identical results.
+        recorder (TimeSeriesRecorder): an optional recorder for the
+          number of people in each disease state on every day.  It is
+          started with the counts for the starting city.
+        graph (ContactGraph): who is in contact with whom.  Only the
+          'numpy' engine can simulate other networks than the ring.
+        num_workers (int): the number of processes for the 'chunked'
+          engine.  Defaults to the number of CPUs.
+
+    Returns tuple (list of tuples, int): the final state of the city
+      and the number of days actually simulated.  The 'runs' engine
+      returns a RunLengthCity when given one.
+    '''
+
+    if engine not in ENGINES:
+        raise ValueError("Unknown engine {}: expected one of {}".format(
+            engine, ENGINES))
+
+    if graph is not None:
+        if engine != 'numpy':
+            raise ValueError("Only the numpy engine supports contact graphs")
+        if len(graph) != len(starting_city):
+            raise ValueError("The contact graph has {} people, the city "
+                             "{}".format(len(graph), len(starting_city)))
+
+    if recorder is not None:
+        recorder.start(count_states(starting_city))
+
+    if engine == 'numpy':
+        states, days = city_to_arrays(starting_city)
+        states, days, days_passed = run_simulation_arrays(states, days,
+                                                          days_contagious,
+                                                          recorder, graph)
+        return arrays_to_city(states, days), days_passed
+
+    if engine == 'frontier':
+        return run_simulation_frontier(starting_city, days_contagious,
+                                       recorder)
+
+    if engine == 'chunked':
+        return run_simulation_chunked(starting_city, days_contagious,
+                                      num_workers, recorder)
+
+    if engine == 'runs':
+        if isinstance(starting_city, RunLengthCity):
+            return starting_city.run(days_contagious, recorder)
+        city, days_passed = RunLengthCity.from_tuples(starting_city).run(
+            days_contagious, recorder)
+        return city.to_tuples(), days_passed
+
+    if engine == 'compact':
+        city = City.from_tuples(starting_city)
+        days_passed = city.run(days_contagious, recorder)
+        return city.to_tuples(), days_passed
+
+    if isinstance(starting_city, RunLengthCity):
+        starting_city = starting_city.to_tuples()
+
+    # Initialize at 0 the counter of days passed in the simulation.
+    days_passed = 0
+    transmission_possible = is_transmission_possible(starting_city)
+
+    # Each day both advances the city and checks the stopping condition
+    # for the next one in a single pass.
+    while transmission_possible:
+        days_passed += 1
+        starting_city, transmission_possible = simulate_one_day_fused(
+            starting_city, days_contagious, recorder)
+
+    return starting_city, days_passed
+
+
+def vaccinate_person(vax_tuple, rng=random):
+    '''
+    Attempt to vaccinate a single person based on their current
+    disease state and personal eagerness to be vaccinated.
+
+    Args:
+        vax_tuple (string, int, float): information about a person,
+          including their eagerness to be vaccinated.
+        rng (random.Random): the random number generator to draw from.
+          Defaults to the global one in the random module.
+
+    Returns (string, int): a person tuple
+    '''
+
+    ds, d, e = vax_tuple
+    # Allocate space for the new person_tuple.
+    person_tuple = ()
+
+    # A susceptible person is vaccinated only when the random number 
+    # generated is strictly less than the eagerness to get vaccinated.
+    if ds == 'S' and rng.random() < e:
+        person_tuple = ('V', 0)
+    else:
+        person_tuple = (ds, d)
+
+    return person_tuple
+
+
+def vaccinate_city(city_vax_tuples, random_seed, rng=None):
+    '''
+    Vaccinate the people in the city based on their current state and
+    eagerness to be vaccinated.
+
+    Args:
+        city_vax_tuples (list of (string, int, float) triples):
+          state of all people in the simulation at the start
+          of the simulation, including their eagerness to be vaccinated.
+        random_seed (int): seed for the random number generator
+        rng (random.Random): an independent random number generator to
+          draw from instead.  When given, random_seed is ignored and the
+          global random module is left untouched.
+
+    Returns (list of (string, int) tuples): state of the people in the
+      city after vaccination
+    '''
+    
+    # Allocate space for the list of tuples of the people in the city
+    #after the vaccination.
+    new_city_tuples = []
+
+    # Set random seed.
+    if rng is None:
+        random.seed(random_seed)
+        rng = random
+
+    for vax_tuple in city_vax_tuples:
+        new_city_tuples.append(vaccinate_person(vax_tuple, rng))
+        
+    return new_city_tuples
+
+
+def vaccinate_and_simulate(city_vax_tuples, days_contagious, random_seed,
+                           engine='tuple', rng=None, recorder=None,
+                           graph=None,
+                           cache=None):  # pylint: disable=too-many-arguments
+    """
+    Vaccinate the city and then simulate the infection spread
+
+    Args:
+        city_vax_tuples (list): a list with the state of the people in the city,
+            including their eagerness to be vaccinated.
+        days_contagious (int): the number of days a person is infected
+        random_seed (int): the seed for the random number generator
+        engine (string): the simulation engine to use (see run_simulation)
+        rng (random.Random): an independent random number generator to
+          use for the vaccinations (see vaccinate_city)
+        recorder (TimeSeriesRecorder): an optional recorder for the
+          daily counts (see run_simulation)
+        graph (ContactGraph): who is in contact with whom (see
+          run_simulation)
+        cache (ResultCache): an optional cache of results.  It is only
+          used for seeded runs without rng, recorder or graph, and the
+          vaccinations then draw from their own random.Random, so the
+          global random module is left untouched whether or not the
+          result was cached.
+
+    Returns (list of tuples, int): the state of the city at the end of the
+      simulation and the number of days simulated.
+    """
+
+    if cache is not None and random_seed is not None and rng is None and \
+       recorder is None and graph is None:
+        key = cache.key(city_vax_tuples, days_contagious, random_seed)
+        rv = cache.get(key)
+        if rv is None:
+            rv = vaccinate_and_simulate(city_vax_tuples, days_contagious,
+                                        random_seed, engine,
+                                        random.Random(random_seed))
+            cache.put(key, rv)
+        return rv
+
+    city_vax_tuples = (vaccinate_city(city_vax_tuples, random_seed, rng))
+
+    city_vax_tuples = run_simulation(city_vax_tuples, days_contagious, engine,
+                                     recorder, graph)
+    
+    return city_vax_tuples
+
+
+# Cached results start with this magic string and the number of days
+# simulated (uint64), little-endian, followed by the final city in the
+# binary format.
+CACHE_MAGIC = b"SIRCACH\0"
+CACHE_HEADER = struct.Struct("<8sQ")
+
+
+class ResultCache:
+    '''
+    Class for caching the results of vaccinate_and_simulate on disk.
+
+    Every result is kept in its own file, named after a digest of the
+    city and the parameters, so changing the city in any way changes
+    the key and the stale result is simply never read again.  The
+    modification time of a file records when it was last used, and the
+    least recently used results are deleted once there are more than
+    max_entries of them.
+
+    Attributes:
+        directory (string): the directory holding the cached results
+        max_entries (int): the largest number of results to keep
+
+    Methods:
+        key(city_vax_tuples, days_contagious, random_seed): string
+            the key for a call to vaccinate_and_simulate
+        get(key): (list of tuples, int)
+            a cached result, or None
+        put(key, result): cache a result
+    '''
+
+    __slots__ = ('directory', 'max_entries')
+
+    def __init__(self, directory, max_entries=1024):
+        '''
+        Construct a cache, creating its directory if needed.
+
+        Args:
+            directory (string): the directory holding the cached results
+            max_entries (int): the largest number of results to keep
+        '''
+        assert max_entries > 0, "max_entries must be positive"
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_entries = max_entries
+
+    @staticmethod
+    def key(city_vax_tuples, days_contagious, random_seed):
+        '''
+        Compute the key for a call to vaccinate_and_simulate.  Every
+        engine gives the same result, so the engine is not part of it.
+
+        Args:
+            city_vax_tuples (list): the vax tuples for the city
+            days_contagious (int): the number of days a person is
+              infected
+            random_seed (int): the seed for the random number generator
+
+        Returns (string): the hex digest of the city and the parameters
+        '''
+        digest = hashlib.sha256()
+        digest.update(repr((days_contagious, random_seed)).encode())
+        for vax_tuple in city_vax_tuples:
+            digest.update(repr(tuple(vax_tuple)).encode())
+
+        return digest.hexdigest()
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key + ".sir")
+
+    def get(self, key):
+        '''
+        Look up a result, marking it as recently used.
+
+        Args:
+            key (string): the key (see key)
+
+        Returns (list of tuples, int): the final city and the number of
+          days simulated, or None if the result is not in the cache.
+        '''
+        filename = self._filename(key)
+        try:
+            with open(filename, "rb") as f:
+                data = f.read()
+            os.utime(filename)
+        except IOError:
+            return None
+
+        if len(data) < CACHE_HEADER.size:
+            return None
+        magic, days_passed = CACHE_HEADER.unpack_from(data)
+        if magic != CACHE_MAGIC:
+            return None
+
+        city = city_from_buffer(data, CACHE_HEADER.size, filename)
+        if city is None:
+            return None
+
+        return city.to_tuples(), days_passed
+
+    def put(self, key, result):
+        '''
+        Save a result atomically (see save_checkpoint) and evict the
+        least recently used results if the cache is full.
+
+        Args:
+            key (string): the key (see key)
+            result (list of tuples, int): the final city and the number
+              of days simulated
+        '''
+        city, days_passed = result
+        filename = self._filename(key)
+
+        tmp_filename = "{}.{}.tmp".format(filename, os.getpid())
+        with open(tmp_filename, "wb") as f:
+            f.write(CACHE_HEADER.pack(CACHE_MAGIC, days_passed))
+            write_city(f, City.from_tuples(city))
+        os.replace(tmp_filename, filename)
+
+        self._evict()
+
+    def _evict(self):
+        '''
+        Delete the least recently used results beyond max_entries.
+        '''
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".sir"):
+                    try:
+                        entries.append((entry.stat().st_mtime_ns,
+                                        entry.path))
+                    except FileNotFoundError:
+                        pass
+
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def seeded_random_state(random_seed):
+    """
+    Create a NumPy random number generator whose uniform draws are
+    the same as random.random() after random.seed(random_seed).  Both
+    use the Mersenne Twister, so the state is simply copied over.
+
+    Args:
+        random_seed (int): the seed for the random number generator
+
+    Returns (np.random.RandomState): the generator
+    """
+
+    _, internal_state, _ = random.Random(random_seed).getstate()
+    random_state = np.random.RandomState()
+    random_state.set_state(("MT19937",
+                            np.array(internal_state[:-1], dtype=np.uint32),
+                            internal_state[-1]))
+
+    return random_state
+
+
+def vaccinate_city_batch(city_vax_tuples, random_seeds, eagerness_scales):
+    """
+    Vaccinate a city under every combination of a random seed and a
+    scaling of everyone's eagerness to be vaccinated, with one
+    vectorized draw of uniform numbers per seed.
+
+    Scenario (i, j) is vaccinated exactly like vaccinate_city with
+    random_seeds[i] and every eagerness multiplied by
+    eagerness_scales[j].
+
+    Args:
+        city_vax_tuples (list of (string, int, float) triples):
+          state of all people in the simulation at the start
+          of the simulation, including their eagerness to be vaccinated.
+        random_seeds (list of ints): the seeds for the random number
+          generator
+        eagerness_scales (list of floats): the multipliers for the
+          eagerness to be vaccinated
+
+    Returns (tuple of arrays): the disease state codes and day counts
+      of the vaccinated cities, both with shape
+      (len(random_seeds), len(eagerness_scales), len(city_vax_tuples)).
+    """
+
+    states, days = city_to_arrays([(ds, d) for ds, d, _ in city_vax_tuples])
+    eagerness = np.array([e for _, _, e in city_vax_tuples], dtype=float)
+
+    return vaccinate_arrays_batch(states, days, eagerness, random_seeds,
+                                  eagerness_scales)
+
+
+def vaccinate_arrays_batch(states, days, eagerness, random_seeds,
+                           eagerness_scales):
+    """
+    Vaccinate the array representation of a city under every
+    combination of a random seed and an eagerness scaling (see
+    vaccinate_city_batch).
+
+    Args:
+        states (array): the disease state code of each person
+        days (array): the number of days each person has been in that
+          state
+        eagerness (array): each person's eagerness to be vaccinated
+        random_seeds (list of ints): the seeds for the random number
+          generator
+        eagerness_scales (list of floats): the multipliers for the
+          eagerness to be vaccinated
+
+    Returns (tuple of arrays): the disease state codes and day counts
+      of the vaccinated cities, both with shape
+      (len(random_seeds), len(eagerness_scales), len(states)).
+    """
+
+    # Only susceptible people draw a random number, in city order.
+    susceptible = np.flatnonzero(states == SUSCEPTIBLE)
+    draws = np.array([seeded_random_state(seed).random_sample(len(susceptible))
+                      for seed in random_seeds]).reshape(len(random_seeds),
+                                                         len(susceptible))
+    thresholds = np.multiply.outer(np.asarray(eagerness_scales, dtype=float),
+                                   eagerness[susceptible])
+    vaccinated = draws[:, np.newaxis, :] < thresholds[np.newaxis, :, :]
+
+    shape = (len(random_seeds), len(eagerness_scales), len(states))
+    batch_states = np.broadcast_to(states, shape).copy()
+    batch_days = np.broadcast_to(days, shape).copy()
+    batch_states[..., susceptible] = np.where(vaccinated, VACCINATED,
+                                              SUSCEPTIBLE)
+    batch_days[..., susceptible] = np.where(vaccinated, 0, days[susceptible])
+
+    return batch_states, batch_days
+
+
+def vaccinate_and_simulate_batch(city_vax_tuples, days_contagious,
+                                 random_seeds, eagerness_scales, graph=None):
+    """
+    Vaccinate and simulate a city under every combination of a random
+    seed and an eagerness scaling (see vaccinate_city_batch), advancing
+    all of the scenarios together as a (scenario x person) array.
+
+    Args:
+        city_vax_tuples (list): a list with the state of the people in the city,
+            including their eagerness to be vaccinated.
+        days_contagious (int): the number of days a person is infected
+        random_seeds (list of ints): the seeds for the random number
+          generator
+        eagerness_scales (list of floats): the multipliers for the
+          eagerness to be vaccinated
+        graph (ContactGraph): who is in contact with whom (defaults to
+          the ring)
+
+    Returns (2-D array of ints): the number of days simulated for each
+      seed (row) and eagerness scaling (column).
+    """
+
+    states, days = vaccinate_city_batch(city_vax_tuples, random_seeds,
+                                        eagerness_scales)
+    num_seeds, num_scales, size = states.shape
+    num_rows = num_seeds * num_scales
+    days_simulated = simulate_batch(states.reshape(num_rows, size),
+                                    days.reshape(num_rows, size),
+                                    days_contagious, graph)
+
+    return days_simulated.reshape(num_seeds, num_scales)
+
+
+def simulate_batch(states, days, days_contagious, graph=None):
+    """
+    Run the entire simulation on a batch of cities at once.
+
+    Args:
+        states (2-D array): the disease state codes, one city per row.
+          Updated in place.
+        days (2-D array): the day counts, one city per row.  Updated in
+          place.
+        days_contagious (int): the number of days a person is infected
+        graph (ContactGraph): who is in contact with whom (defaults to
+          the ring)
+
+    Returns (array of ints): the number of days simulated for each city
+    """
+
+    days_simulated = np.zeros(len(states), dtype=np.int64)
+    active = transmission_possible_rows(states, graph)
+
+    # Only the scenarios in which transmission is still possible move
+    # forward each day.
+    while active.any():
+        rows = np.flatnonzero(active)
+        new_states, new_days = simulate_one_day_arrays(states[rows],
+                                                       days[rows],
+                                                       days_contagious,
+                                                       graph=graph)
+        states[rows] = new_states
+        days[rows] = new_days
+        days_simulated[rows] += 1
+        active[rows] = transmission_possible_rows(new_states, graph)
+
+    return days_simulated
+
+
+def trial_seed(random_seed, trial):
+    """
+    Compute the seed used for a single trial in run_trials.
+
+    Args:
+        random_seed (int): the seed for the random number generator
+        trial (int): the number of the trial, starting at 0
+
+    Returns (int): the seed for the trial
+    """
+
+    if random_seed:
+        return random_seed + trial
+    return random_seed
+
+
+# The city and parameters shared by every trial in a worker process.
+_TRIAL_ARGS = None
+
+
+def _init_trial_worker(vax_city, days_contagious, engine):
+    """
+    Store the city in a worker process once, so that it is not sent
+    along with every trial.
+    """
+
+    global _TRIAL_ARGS  # pylint: disable=global-statement
+    _TRIAL_ARGS = (vax_city, days_contagious, engine)
+
+
+def _run_trial(seed):
+    """
+    Run one trial in a worker process with its own random number
+    generator.
+
+    Returns (int): the number of days simulated
+    """
+
+    vax_city, days_contagious, engine = _TRIAL_ARGS
+    _, num_days_simulated = vaccinate_and_simulate(
+        vax_city, days_contagious, seed, engine, random.Random(seed))
+
+    return num_days_simulated
+
+
+class DayCounts:
+    '''
+    Class for streaming trial results into a histogram of the number of
+    days each trial took.  Trials take few distinct numbers of days, so
+    any order statistic is found by walking the histogram instead of
+    sorting every result.
+
+    Attributes:
+        counts (dictionary): the number of trials that took each number
+          of days
+        total (int): the number of trials recorded
+
+    Methods:
+        add(num_days): record one trial
+        order_statistic(k): int
+            the k-th smallest number of days, counting from 0
+        median(): int
+            the median as computed by run_trials
+        median_interval(confidence): (int, int)
+            a confidence interval for the median
+    '''
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        '''
+        Construct an empty histogram.
+        '''
+        self.counts = {}
+        self.total = 0
+
+    def add(self, num_days):
+        '''
+        Record the result of one trial.
+
+        Args:
+            num_days (int): the number of days the trial took
+        '''
+        self.counts[num_days] = self.counts.get(num_days, 0) + 1
+        self.total += 1
+
+    def order_statistic(self, k):
+        '''
+        Find the k-th smallest result.
+
+        Args:
+            k (int): the rank, counting from 0
+
+        Returns (int): the number of days
+        '''
+        assert 0 <= k < self.total, "rank out of range"
+
+        for num_days in sorted(self.counts):
+            k -= self.counts[num_days]
+            if k < 0:
+                return num_days
+
+        # Unreachable: the counts add up to total.
+        return None
+
+    def median(self):
+        '''
+        Find the median, the same element run_trials picks.
+
+        Returns (int): the median number of days
+        '''
+        return self.order_statistic(self.total // 2)
+
+    def median_interval(self, confidence):
+        '''
+        Compute a distribution-free confidence interval for the median
+        from the order statistics whose ranks are z * sqrt(n) / 2 away
+        from n / 2, using the normal approximation to the binomial.
+
+        Args:
+            confidence (float): the confidence level, between 0 and 1
+
+        Returns ((int, int)): the lower and upper bounds
+        '''
+        n = self.total
+        half_width = statistics.NormalDist().inv_cdf((1 + confidence) / 2) \
+            * math.sqrt(n) / 2
+        low = max(0, math.floor((n - 1) / 2 - half_width))
+        high = min(n - 1, math.ceil((n - 1) / 2 + half_width))
+
+        return self.order_statistic(low), self.order_statistic(high)
+
+
+# The smallest number of trials run_trials_adaptive runs before it
+# checks whether the median is stable.
+MIN_ADAPTIVE_TRIALS = 10
+
+
+def run_trials_adaptive(vax_city, days_contagious, random_seed, max_trials,
+                        tolerance, confidence=0.95,
+                        min_trials=MIN_ADAPTIVE_TRIALS, engine='tuple',
+                        num_workers=1):  # pylint: disable=too-many-arguments
+    """
+    Run trials of vaccinate_and_simulate, like run_trials, but stop as
+    soon as the median is stable: once both ends of its confidence
+    interval are within tolerance days of the median.  The trials use
+    the same seeds as run_trials, so if every trial is run the median
+    is the same.  With more than one worker, the trials run in batches
+    of num_workers and the median is checked after each batch.
+
+    Args:
+        vax_city (list of (string, int, float) triples): a list with vax
+            tuples for the people in the city
+        days_contagious (int): the number of days a person is infected
+        random_seed (int): the seed for the random number generator
+        max_trials (int): the largest number of trial simulations to run
+        tolerance (int): how many days the confidence interval may
+            stretch on either side of the median
+        confidence (float): the confidence level of the interval
+        min_trials (int): the number of trials to run before checking
+            whether the median is stable
+        engine (string): the simulation engine to use (see run_simulation)
+        num_workers (int): the number of processes to spread each batch
+            of trials across
+
+    Returns:
+        (int, (int, int), int) the median number of days until infection
+        transmission stops, its confidence interval and the number of
+        trials run
+    """
+
+    assert max_trials > 0, "max_trials must be positive"
+    assert 0 < confidence < 1, "confidence must be between 0 and 1"
+
+    results = DayCounts()
+
+    with (ProcessPoolExecutor(num_workers, initializer=_init_trial_worker,
+                              initargs=(vax_city, days_contagious, engine))
+          if num_workers > 1 else contextlib.nullcontext()) as pool:
+        while results.total < max_trials:
+            seeds = [trial_seed(random_seed, i)
+                     for i in range(results.total,
+                                    min(results.total + num_workers,
+                                        max_trials))]
+            if pool is None:
+                days = [vaccinate_and_simulate(vax_city, days_contagious,
+                                               seed, engine)[1]
+                        for seed in seeds]
+            else:
+                days = pool.map(_run_trial, seeds)
+            for num_days_simulated in days:
+                results.add(num_days_simulated)
+
+            if results.total >= min_trials:
+                median = results.median()
+                low, high = results.median_interval(confidence)
+                if median - low <= tolerance and high - median <= tolerance:
+                    break
+
+    return (results.median(), results.median_interval(confidence),
+            results.total)
+
+
+# The largest number of people simulated at once by a sweep worker; the
+# trials for a sweep point are batched to stay under it.
+SWEEP_BATCH_PEOPLE = 1 << 22
+
+# The city shared by every sweep point in a worker process: the shared
+# memory blocks (kept open while the worker runs) and the arrays that
+# view them.
+_SWEEP_BLOCKS = None
+_SWEEP_CITY = None
+
+
+def _init_sweep_worker(descriptions):
+    """
+    Attach a worker process to the city shared by run_sweep.
+    """
+
+    global _SWEEP_BLOCKS, _SWEEP_CITY  # pylint: disable=global-statement
+    _SWEEP_BLOCKS, _SWEEP_CITY = attach_arrays(descriptions)
+
+
+def _run_sweep_point(point):
+    """
+    Run one sweep point in a worker process.
+
+    Returns (int): the median number of days simulated
+    """
+
+    return sweep_point(*_SWEEP_CITY, *point)
+
+
+def sweep_point(states, days, eagerness, days_contagious, random_seed,
+                num_trials):
+    """
+    Compute the median number of days simulated over several trials,
+    like run_trials, on the array representation of a vax city.  The
+    trials are vaccinated and simulated in batches (see
+    vaccinate_arrays_batch and simulate_batch).
+
+    Args:
+        states (array): the disease state code of each person
+        days (array): the number of days each person has been in that
+          state
+        eagerness (array): each person's eagerness to be vaccinated
+        days_contagious (int): the number of days a person is infected
+        random_seed (int): the seed for the random number generator
+        num_trials (int): the number of trial simulations to run
+
+    Returns (int): the median number of days until infection
+      transmission stops
+    """
+
+    seeds = [trial_seed(random_seed, i) for i in range(num_trials)]
+    batch_size = max(1, SWEEP_BATCH_PEOPLE // max(len(states), 1))
+
+    trial_days = []
+    for start in range(0, num_trials, batch_size):
+        batch_seeds = seeds[start:start + batch_size]
+        batch_states, batch_days = vaccinate_arrays_batch(
+            states, days, eagerness, batch_seeds, [1.0])
+        trial_days.extend(simulate_batch(
+            batch_states.reshape(len(batch_seeds), len(states)),
+            batch_days.reshape(len(batch_seeds), len(states)),
+            days_contagious).tolist())
+
+    return sorted(trial_days)[num_trials // 2]
+
+
+def run_sweep(vax_city, days_contagious_values, random_seeds, trial_counts,
+              num_workers=1):
+    """
+    Run trials for every combination of the number of days contagious,
+    the random seed and the number of trials.  The city is converted to
+    arrays once and, with more than one worker, shared with the worker
+    processes through shared memory rather than sent to each of them.
+
+    Args:
+        vax_city (list of (string, int, float) triples): a list with vax
+            tuples for the people in the city
+        days_contagious_values (list of ints): the numbers of days a
+          person is infected
+        random_seeds (list of ints): the seeds for the random number
+          generator
+        trial_counts (list of ints): the numbers of trials to run
+        num_workers (int): the number of processes to spread the sweep
+          points across
+
+    Returns (list of tuples): a (days_contagious, random_seed,
+      num_trials, median_days) row for every combination.
+    """
+
+    states, days = city_to_arrays([(ds, d) for ds, d, _ in vax_city])
+    eagerness = np.array([e for _, _, e in vax_city], dtype=float)
+
+    points = [(days_contagious, random_seed, num_trials)
+              for days_contagious in days_contagious_values
+              for random_seed in random_seeds
+              for num_trials in trial_counts]
+
+    if num_workers > 1:
+        blocks, descriptions = share_arrays([states, days, eagerness])
+        try:
+            with ProcessPoolExecutor(num_workers,
+                                     initializer=_init_sweep_worker,
+                                     initargs=(descriptions,)) as pool:
+                medians = list(pool.map(_run_sweep_point, points))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+    else:
+        medians = [sweep_point(states, days, eagerness, *point)
+                   for point in points]
+
+    return [point + (median,) for point, median in zip(points, medians)]
+
+
+SWEEP_COLUMNS = ("days_contagious", "random_seed", "num_trials",
+                 "median_days")
+
+
+def save_sweep(rows, filename):
+    """
+    Save the results of a sweep as a table: a CSV file if the filename
+    ends in .csv, and otherwise a NumPy .npz file with one array per
+    column.
+
+    Args:
+        rows (list of tuples): the rows returned by run_sweep
+        filename (string): the name of the file
+    """
+
+    if filename.endswith(".csv"):
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(SWEEP_COLUMNS)
+            writer.writerows(rows)
+    else:
+        columns = list(zip(*rows)) or [()] * len(SWEEP_COLUMNS)
+        np.savez(filename, **{name: np.array(column, dtype=np.int64)
+                              for name, column in zip(SWEEP_COLUMNS,
+                                                      columns)})
+
+
+# The functions timed while profiling, and those among them that each
+# advance a city by one day.  Methods are named "<Class>.<method>".
+PROFILED_FUNCTIONS = ("has_an_infected_neighbor",
+                      "advance_person_at_location",
+                      "is_transmission_possible",
+                      "simulate_one_day",
+                      "simulate_one_day_fused",
+                      "is_transmission_possible_arrays",
+                      "simulate_one_day_arrays",
+                      "susceptible_frontier",
+                      "simulate_one_day_chunked",
+                      "City.is_transmission_possible",
+                      "City.step",
+                      "RunLengthCity.is_transmission_possible",
+                      "RunLengthCity.next_day")
+DAY_FUNCTIONS = ("simulate_one_day", "simulate_one_day_fused",
+                 "simulate_one_day_arrays", "simulate_one_day_chunked",
+                 "City.step",
+                 "RunLengthCity.next_day")
+
+
+class Profile:
+    '''
+    Class for the call counts and wall times collected while profiling.
+
+    Times are inclusive: the time spent in simulate_one_day includes
+    the time spent in the advance_person_at_location calls it makes.
+
+    Attributes:
+        calls (dictionary): the number of calls to each function
+        seconds (dictionary): the total time spent in each function
+        day_seconds (list of floats): the time taken by each simulated
+          day, in order
+
+    Methods:
+        record(name, seconds):
+            record a call to a function
+        summary(): string
+            a table of the results
+    '''
+
+    __slots__ = ('calls', 'seconds', 'day_seconds')
+
+    def __init__(self):
+        '''
+        Construct an empty profile.
+        '''
+        self.calls = {name: 0 for name in PROFILED_FUNCTIONS}
+        self.seconds = {name: 0.0 for name in PROFILED_FUNCTIONS}
+        self.day_seconds = []
+
+    def record(self, name, seconds):
+        '''
+        Record a call to a function.
+
+        Args:
+            name (string): the name of the function
+            seconds (float): how long the call took
+        '''
+        self.calls[name] += 1
+        self.seconds[name] += seconds
+        if name in DAY_FUNCTIONS:
+            self.day_seconds.append(seconds)
+
+    def summary(self):
+        '''
+        Summarize the profile as a table, one row per function that was
+        called, followed by the per-day times.
+
+        Returns (string): the summary
+        '''
+        lines = ["{:<38} {:>8} {:>12} {:>14}".format(
+            "function", "calls", "total (s)", "per call (us)")]
+        for name in PROFILED_FUNCTIONS:
+            calls = self.calls[name]
+            if calls:
+                lines.append("{:<38} {:>8} {:>12.6f} {:>14.3f}".format(
+                    name, calls, self.seconds[name],
+                    1e6 * self.seconds[name] / calls))
+
+        if self.day_seconds:
+            lines.append("Simulated days: {}, total {:.6f}s, mean {:.6f}s, "
+                         "max {:.6f}s".format(
+                             len(self.day_seconds), sum(self.day_seconds),
+                             sum(self.day_seconds) / len(self.day_seconds),
+                             max(self.day_seconds)))
+
+        return "\n".join(lines)
+
+
+def _timed(name, func, profile):
+    '''
+    Wrap a function so that every call to it is recorded in a profile.
+    '''
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def profiling():
+    '''
+    Count the calls to and time the functions in PROFILED_FUNCTIONS
+    made inside a with block:
+
+        with profiling() as profile:
+            run_simulation(city, days_contagious)
+        print(profile.summary())
+
+    The functions are swapped for timed versions on entry and restored
+    on exit, so there is no cost at all when not profiling.  Only calls
+    made in the current process are counted.
+
+    Yields (Profile): the profile being collected
+    '''
+
+    profile = Profile()
+    module_globals = globals()
+    originals = {}
+
+    # Methods are named "Class.method" and swapped on the class.
+    for name in PROFILED_FUNCTIONS:
+        if "." in name:
+            class_name, method = name.split(".")
+            originals[name] = getattr(module_globals[class_name], method)
+            setattr(module_globals[class_name], method,
+                    _timed(name, originals[name], profile))
+        else:
+            originals[name] = module_globals[name]
+            module_globals[name] = _timed(name, originals[name], profile)
+
+    try:
+        yield profile
+    finally:
+        for name, func in originals.items():
+            if "." in name:
+                class_name, method = name.split(".")
+                setattr(module_globals[class_name], method, func)
+            else:
+                module_globals[name] = func
+
+
+################ Do not change the code below this line #######################
+
+def run_trials(vax_city, days_contagious, random_seed, num_trials,
+               num_workers=1, engine='tuple'):
+    """
+    Run multiple trials of vaccinate_and_simulate and compute the median
+    result for the number of days until infection transmission stops.
+
+    Args:
+        vax_city (list of (string, int, float) triples): a list with vax
+            tuples for the people in the city
+        days_contagious (int): the number of days a person is infected
+        random_seed (int): the seed for the random number generator
+        num_trials (int): the number of trial simulations to run
+        num_workers (int): the number of processes to spread the trials
+            across.  With more than one, every trial draws from its own
+            random.Random instance seeded like the serial trial, so the
+            median is the same.
+        engine (string): the simulation engine to use (see run_simulation)
+
+    Returns:
+        (int) the median number of days until infection transmission stops
+    """
+
+    seeds = [trial_seed(random_seed, i) for i in range(num_trials)]
+
+    if num_workers > 1:
+        chunksize = max(1, num_trials // (4 * num_workers))
+        with ProcessPoolExecutor(num_workers, initializer=_init_trial_worker,
+                                 initargs=(vax_city, days_contagious,
+                                           engine)) as pool:
+            days = list(pool.map(_run_trial, seeds, chunksize=chunksize))
+    else:
+        days = []
+        for seed in seeds:
+            _, num_days_simulated = vaccinate_and_simulate(vax_city,
+                                                           days_contagious,
+                                                           seed, engine)
+            days.append(num_days_simulated)
+
+    # quick way to compute the median
+    return sorted(days)[num_trials // 2]
+
+
+def parse_city_file(filename, is_vax_tuple, run_length=False):
+    """
+    Read a city represented as person tuples or vax tuples from
+    a file.
+
+    Args:
+        filename (string): the name of the file
+        is_vax_tuple (boolean): True if the file is expected to contain
+          (string, int) pairs.  False if the file is expected to contain
+          (string, int, float) triples.
+        run_length (boolean): if True, read a city of person tuples
+          straight into a RunLengthCity, without building a tuple per
+          person
+
+    Returns: list of tuples, RunLengthCity or None, if the file does
+      not exist or cannot be parsed.
+    """
+
+    assert not (is_vax_tuple and run_length), \
+        "Only person cities can be run-length encoded"
+
+    if not is_vax_tuple and is_binary_city_file(filename):
+        city = load_binary_city_file(filename)
+        if city is None:
+            return None
+        if run_length:
+            return RunLengthCity.from_arrays(city.states, city.days)
+        return city.to_tuples()
+
+    try:
+        f = open(filename)
+    except IOError:
+        print("Could not open:", filename, file=sys.stderr)
+        return None
+
+    ds_types = ('S', 'I', 'R', 'V')
+
+    # Validate the file one line at a time rather than reading it all
+    # into memory first.
+    rv = RunLengthCity() if run_length else []
+    with f:
+        if is_vax_tuple:
+            try:
+                for i, line in enumerate(f):
+                    ds, nd, ve = line.split()
+                    num_days = int(nd)
+                    vax_eagerness = float(ve)
+                    if ds not in ds_types or num_days < 0 or \
+                       vax_eagerness < 0 or vax_eagerness > 1.0:
+                        raise ValueError()
+                    rv.append((ds, num_days, vax_eagerness))
+            except ValueError:
+                emsg = ("Error in line {}: vax tuples are represented "
+                        "with a disease state {}"
+                        "a non-negative integer, and a floating point value "
+                        "between 0 and 1.0.")
+                print(emsg.format(i, ds_types), file=sys.stderr)
+                return None
+        else:
+            try:
+                for i, line in enumerate(f):
+                    ds, nd = line.split()
+                    num_days = int(nd)
+                    if ds not in ds_types or num_days < 0:
+                        raise ValueError()
+                    if run_length:
+                        rv.append(ds, num_days)
+                    else:
+                        rv.append((ds, num_days))
+            except ValueError:
+                emsg = ("Error in line {}: persons are represented "
+                        "with a disease state {} and a non-negative integer.")
+                print(emsg.format(i, ds_types), file=sys.stderr)
+                return None
+    return rv
+
+
+@click.command()
+@click.argument("filename", type=str)
 @click.option("--days-contagious", default=2, type=int)
 @click.option("--task-type", default="no_vax",
               type=click.Choice(['no_vax', 'vax']))
 @click.option("--random-seed", default=None, type=int)
 @click.option("--num-trials", default=1, type=int)
-def cmd(filename, days_contagious, task_type, random_seed, num_trials):
+@click.option("--engine", default="tuple", type=click.Choice(ENGINES))
+@click.option("--num-workers", default=1, type=int)
+@click.option("--save-binary", default=None, type=str,
+              help="Save the city in the binary format to this file and exit")
+@click.option("--time-series", default=None, type=str,
+              help="Save the daily S/I/R/V counts to this .npy file")
+@click.option("--checkpoint", default=None, type=str,
+              help="Periodically save the simulation to this file")
+@click.option("--checkpoint-every", default=100, type=click.IntRange(min=1),
+              help="Number of simulated days between checkpoints")
+@click.option("--resume", is_flag=True,
+              help="Continue from the checkpoint file, if it exists")
+@click.option("--profile", is_flag=True,
+              help="Count calls to and time the hot functions")
+@click.option("--tolerance", default=None, type=click.IntRange(min=0),
+              help="Stop the trials once the median is stable to within "
+                   "this many days")
+@click.option("--confidence", default=0.95,
+              type=click.FloatRange(0, 1, min_open=True, max_open=True),
+              help="Confidence level for --tolerance")
+@click.option("--cache", default=None, type=str,
+              help="Cache vax clinic and simulation results in this "
+                   "directory")
+@click.option("--cache-size", default=1024, type=click.IntRange(min=1),
+              help="Number of results to keep in the cache")
+def cmd(filename, days_contagious, task_type, random_seed, num_trials,
+        engine, num_workers, save_binary, time_series, checkpoint,
+        checkpoint_every, resume, profile, tolerance, confidence, cache,
+        cache_size):
     '''
     Process the command-line arguments and do the work.
     '''
-    city = parse_city_file(filename, task_type == "vax")
+    result_cache = ResultCache(cache, cache_size) if cache else None
+
+    with (profiling() if profile else contextlib.nullcontext()) as stats:
+        try:
+            if checkpoint or resume:
+                if task_type == "vax" or time_series or not checkpoint:
+                    print("--checkpoint and --resume need a no_vax "
+                          "simulation and cannot be combined with "
+                          "--time-series", file=sys.stderr)
+                    return -1
+                return cmd_checkpointed(filename, days_contagious,
+                                        checkpoint, checkpoint_every, resume)
+            if time_series and task_type == "vax" and num_trials > 1:
+                print("--time-series needs a single simulation and cannot be "
+                      "combined with --num-trials above 1 or --tolerance",
+                      file=sys.stderr)
+                return -1
+
+            if task_type == "no_vax" and (engine == "compact"
+                                          or save_binary):
+                # Load straight into a compact city, skipping the person
+                # tuples.
+                city = load_city(filename)
+            elif task_type == "no_vax" and engine == "runs":
+                city = parse_city_file(filename, False, run_length=True)
+            else:
+                city = parse_city_file(filename, task_type == "vax")
+            if not city:
+                return -1
+
+            recorder = TimeSeriesRecorder() if time_series else None
+
+            if save_binary:
+                if task_type == "vax":
+                    print("Only person cities can be saved in the binary "
+                          "format", file=sys.stderr)
+                    return -1
+                save_city_file(city, save_binary)
+                print("Saved city to", save_binary)
+            elif task_type == "no_vax" and engine == "compact":
+                print("Running simulation ...")
+                if recorder is not None:
+                    recorder.start(city.count_states())
+                num_days_simulated = city.run(days_contagious, recorder)
+                print("Final city:", city.to_tuples())
+                print("Days simulated:", num_days_simulated)
+            elif task_type == "no_vax":
+                print("Running simulation ...")
+                final_city, num_days_simulated = run_simulation(
+                    city, days_contagious, engine, recorder,
+                    num_workers=num_workers)
+                if isinstance(final_city, RunLengthCity):
+                    final_city = final_city.to_tuples()
+                print("Final city:", final_city)
+                print("Days simulated:", num_days_simulated)
+            elif num_trials == 1:
+                print("Running one vax clinic and simulation ...")
+                final_city, num_days_simulated = vaccinate_and_simulate(
+                    city, days_contagious, random_seed, engine,
+                    recorder=recorder, cache=result_cache)
+                print("Final city:", final_city)
+                print("Days simulated:", num_days_simulated)
+            elif tolerance is not None:
+                print("Running trials of the vax clinic and simulation until "
+                      "the median is stable ...")
+                median_num_days, (low, high), trials_run = run_trials_adaptive(
+                    city, days_contagious, random_seed, num_trials, tolerance,
+                    confidence, engine=engine, num_workers=num_workers)
+                print("Median number of days until infection transmission "
+                      "stops:", median_num_days)
+                print("{:.0%} confidence interval: [{}, {}] after {} of {} "
+                      "trials".format(confidence, low, high, trials_run,
+                                      num_trials))
+            else:
+                print("Running multiple trials of the vax clinic and "
+                      "simulation ...")
+                median_num_days = run_trials(city, days_contagious,
+                                             random_seed, num_trials,
+                                             num_workers, engine)
+                print("Median number of days until infection transmission "
+                      "stops:", median_num_days)
+
+            if recorder is not None and recorder.time_series().size:
+                np.save(time_series, recorder.time_series())
+                print("Saved daily counts to", time_series)
+            return 0
+        finally:
+            if profile:
+                print("Profile:")
+                print(stats.summary())
+
+
+def cmd_checkpointed(filename, days_contagious, checkpoint, checkpoint_every,
+                     resume):
+    '''
+    Run a simulation on a compact city with periodic checkpoints,
+    resuming from the checkpoint file if asked to and it exists.
+    '''
+    if resume and os.path.exists(checkpoint):
+        loaded = load_checkpoint(checkpoint)
+        if loaded is None:
+            return -1
+        city, days_passed, checkpoint_days_contagious = loaded
+        if checkpoint_days_contagious != days_contagious:
+            print("The checkpoint was saved with --days-contagious",
+                  checkpoint_days_contagious, file=sys.stderr)
+            return -1
+        print("Resuming simulation after day", days_passed, "...")
+    else:
+        city = load_city(filename)
+        if not city:
+            return -1
+        days_passed = 0
+        print("Running simulation ...")
+
+    num_days_simulated = run_with_checkpoints(city, days_contagious,
+                                              checkpoint, checkpoint_every,
+                                              days_passed)
+    print("Final city:", city.to_tuples())
+    print("Days simulated:", num_days_simulated)
+    return 0
+
+
+def parse_int_range(value):
+    '''
+    Parse a command-line list of integers: comma-separated values and
+    START:STOP[:STEP] ranges, with STOP included, e.g. "1:5,10".
+
+    Args:
+        value (string): the option value
+
+    Returns (list of ints): the integers
+    '''
+    rv = []
+    for part in value.split(","):
+        bounds = [int(bound) for bound in part.split(":")]
+        if len(bounds) == 1:
+            rv.append(bounds[0])
+            continue
+
+        step = bounds[2] if len(bounds) == 3 else 1
+        if len(bounds) > 3 or step <= 0:
+            raise click.BadParameter("expected START:STOP[:STEP], got " + part)
+        rv.extend(range(bounds[0], bounds[1] + 1, step))
+
+    return rv
+
+
+@click.command()
+@click.argument("filename", type=str)
+@click.option("--days-contagious", default="2", type=str,
+              help="Numbers of days contagious, e.g. 2:10")
+@click.option("--random-seeds", default="20170217", type=str,
+              help="Random seeds, e.g. 1:100")
+@click.option("--num-trials", default="1", type=str,
+              help="Numbers of trials, e.g. 10,100,1000")
+@click.option("--num-workers", default=1, type=int)
+@click.option("--output", default="sweep.csv", type=str,
+              help="Results table: .csv, or .npz for anything else")
+def sweep(filename, days_contagious, random_seeds, num_trials, num_workers,
+          output):
+    '''
+    Run the vax clinic and simulation trials for every combination of
+    the parameters, loading the city once.
+    '''
+    try:
+        days_contagious_values = parse_int_range(days_contagious)
+        seeds = parse_int_range(random_seeds)
+        trial_counts = parse_int_range(num_trials)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    city = parse_city_file(filename, True)
     if not city:
         return -1
 
-    if task_type == "no_vax":
-        print("Running simulation ...")
-        final_city, num_days_simulated = run_simulation(
-            city, days_contagious)
-        print("Final city:", final_city)
-        print("Days simulated:", num_days_simulated)
-    elif num_trials == 1:
-        print("Running one vax clinic and simulation ...")
-        final_city, num_days_simulated = vaccinate_and_simulate(
-            city, days_contagious, random_seed)
-        print("Final city:", final_city)
-        print("Days simulated:", num_days_simulated)
-    else:
-        print("Running multiple trials of the vax clinic and simulation ...")
-        median_num_days = run_trials(city, days_contagious,
-                                     random_seed, num_trials)
-        print("Median number of days until infection transmission stops:",
-              median_num_days)
+    print("Running {} sweep points ...".format(
+        len(days_contagious_values) * len(seeds) * len(trial_counts)))
+    rows = run_sweep(city, days_contagious_values, seeds, trial_counts,
+                     num_workers)
+    save_sweep(rows, output)
+    print("Saved results to", output)
     return 0
 
 
 if __name__ == "__main__":
-    cmd()  # pylint: disable=no-value-for-parameter
+    # "python3 sir.py sweep ..." runs a parameter sweep; anything else
+    # is a single run.
+    if sys.argv[1:2] == ["sweep"]:
+        sweep.main(sys.argv[2:], prog_name="sir.py sweep")
+    else:
+        cmd()  # pylint: disable=no-value-for-parameter
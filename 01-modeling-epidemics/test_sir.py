@@ -17,8 +17,10 @@ import sys
 import random
 
 import pytest
+from click.testing import CliRunner
 
 import sir
+from topology import ContactGraph
 
 ### TODO: question: can the call to sys.path go away?
 
@@ -396,6 +398,162 @@ def test_vax_simulate_one_day(test_params):
 
 
 
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("simulate_one_day_tests.json")) +
+    list(read_config_file("vax_simulate_one_day_tests.json")))
+def test_simulate_one_day_fused(test_params):
+    """
+    Test that simulate_one_day_fused advances the city like
+    simulate_one_day and reports whether transmission is possible in
+    the new city.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        seed, city, infection rate, number of days contagious,
+        expected result
+    """
+
+    _, params = test_params
+
+    city = params["city"]
+    city_copy = city[:]
+
+    actual_city, actual_possible = sir.simulate_one_day_fused(
+        city, params["days_contagious"])
+
+    expected = convert_city(params, "expected")
+    assert actual_city == expected
+    assert actual_possible == sir.is_transmission_possible(expected)
+    assert city_copy == city, "\nDo not modify the input city!\n"
+
+
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("simulate_one_day_tests.json")) +
+    list(read_config_file("vax_simulate_one_day_tests.json")))
+def test_city_step(test_params):
+    """
+    Test that stepping a compact City matches simulate_one_day_fused and
+    that the city converts back to the same person tuples.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        seed, city, infection rate, number of days contagious,
+        expected result
+    """
+
+    _, params = test_params
+
+    city = sir.City.from_tuples(params["city"])
+    assert city.to_tuples() == params["city"]
+
+    actual_possible = city.step(params["days_contagious"])
+
+    expected = convert_city(params, "expected")
+    assert city.to_tuples() == expected
+    assert actual_possible == sir.is_transmission_possible(expected)
+
+
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("simulate_one_day_tests.json")) +
+    list(read_config_file("vax_simulate_one_day_tests.json")))
+def test_run_length_city_simulate_one_day(test_params):
+    """
+    Test that simulate_one_day and is_transmission_possible give the
+    same results on a RunLengthCity as on the person tuples.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        seed, city, infection rate, number of days contagious,
+        expected result
+    """
+
+    _, params = test_params
+
+    city = sir.RunLengthCity.from_tuples(params["city"])
+    assert city.to_tuples() == params["city"]
+    assert sir.is_transmission_possible(city) == \
+        sir.is_transmission_possible(params["city"])
+
+    actual = sir.simulate_one_day(city, params["days_contagious"])
+
+    assert isinstance(actual, sir.RunLengthCity)
+    assert actual.to_tuples() == convert_city(params, "expected")
+
+
+def test_run_length_city_runs():
+    """
+    Test that a run-length city only splits its runs at infection
+    frontiers and simulates random cities like the tuple engine.
+    """
+
+    city = sir.RunLengthCity.from_tuples(
+        [("S", 0)] * 1000 + [("I", 0)] + [("V", 0)] * 1000)
+    assert len(city.runs) == 3
+
+    city = sir.simulate_one_day(city, 3)
+    assert city.runs == [("S", 1, 999), ("I", 0, 1), ("I", 1, 1),
+                         ("V", 1, 1000)]
+
+    rng = random.Random(sir.TEST_SEED)
+    for _ in range(200):
+        people = [rng.choice([("S", 0), ("S", 0), ("S", 1), ("I", 0),
+                              ("I", 1), ("R", 0), ("V", 0)])
+                  for _ in range(rng.randrange(1, 12))]
+        days_contagious = rng.randrange(1, 4)
+
+        expected = sir.run_simulation(people, days_contagious)
+        actual = sir.run_simulation(people, days_contagious, "runs")
+        assert actual == expected
+
+
+@pytest.mark.parametrize("engine", sir.ENGINES)
+def test_run_length_city_engines(engine):
+    """
+    Test that every engine and predict_days accept a run-length city.
+
+    Inputs:
+      engine (string): the simulation engine to use
+    """
+
+    people = [("S", 0), ("I", 0), ("S", 0), ("S", 0), ("R", 0), ("S", 0),
+              ("S", 1), ("I", 1), ("V", 0)]
+    expected = sir.run_simulation(people, 2)
+
+    final_city, days_passed = sir.run_simulation(
+        sir.RunLengthCity.from_tuples(people), 2, engine)
+    if isinstance(final_city, sir.RunLengthCity):
+        final_city = final_city.to_tuples()
+
+    assert (final_city, days_passed) == expected
+    assert sir.predict_days(sir.RunLengthCity.from_tuples(people)) == \
+        expected[1]
+
+
+def test_parse_city_file_run_length(tmp_path):
+    """
+    Test that parse_city_file reads text and binary files straight into
+    a RunLengthCity.
+    """
+
+    filename = os.path.join(BASE_DIR, "sample_cities", "person_city_1.txt")
+    expected = sir.parse_city_file(filename, False)
+
+    actual = sir.parse_city_file(filename, False, run_length=True)
+    assert isinstance(actual, sir.RunLengthCity)
+    assert actual.to_tuples() == expected
+
+    binary_filename = str(tmp_path / "city.bin")
+    sir.save_city_file(sir.City.from_tuples(expected), binary_filename)
+    actual = sir.parse_city_file(binary_filename, False, run_length=True)
+    assert actual.to_tuples() == expected
+
+
 ###### Task: check stopping condition ######
 def __test_is_transmission_possible(test_params, is_test6):
     """
@@ -459,7 +617,7 @@ def test_vax_is_transmission_possible(test_params):
 
 
 ###### Task: run simulation over multiple days  ######
-def __test_run_simulation(test_params, is_test6):
+def __test_run_simulation(test_params, is_test6, engine="tuple"):
     """
     Test harness for run_simulation
 
@@ -468,6 +626,7 @@ def __test_run_simulation(test_params, is_test6):
       parameters dictionary:
         city, the number of days contagious, and the
         expected result
+      engine (string): the simulation engine to use
     """
 
     test_num, params = test_params
@@ -476,7 +635,8 @@ def __test_run_simulation(test_params, is_test6):
     city_copy = starting_city[:]
 
     actual = sir.run_simulation(starting_city,
-                                params["days_contagious"])
+                                params["days_contagious"],
+                                engine)
 
     recreate_msg = ("See the information for Task 5, Test {} to "
                     "see how to recreate this test.")
@@ -524,6 +684,169 @@ def test_vax_run_simulation(test_params):
     __test_run_simulation(test_params, True)
 
 
+# Alternate engines that must match the tuple engine exactly.
+ALT_ENGINES = ["numpy", "frontier", "compact", "chunked", "runs"]
+
+
+@pytest.mark.parametrize("engine", ALT_ENGINES)
+@pytest.mark.parametrize(
+    "test_params",
+    read_config_file("run_simulation_tests.json"))
+def test_run_simulation_engines(test_params, engine):
+    """
+    Test run_simulation with the alternate engines, no vaxxed people
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        city, the number of days contagious, and the
+        expected result
+      engine (string): the simulation engine to use
+    """
+    __test_run_simulation(test_params, False, engine)
+
+
+@pytest.mark.vax
+@pytest.mark.parametrize("engine", ALT_ENGINES)
+@pytest.mark.parametrize(
+    "test_params",
+    read_config_file("vax_run_simulation_tests.json"))
+def test_vax_run_simulation_engines(test_params, engine):
+    """
+    Test run_simulation with the alternate engines, some vaxxed people
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        city, the number of days contagious, and the
+        expected result
+      engine (string): the simulation engine to use
+    """
+    __test_run_simulation(test_params, True, engine)
+
+
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("run_simulation_tests.json")) +
+    list(read_config_file("vax_run_simulation_tests.json")))
+def test_predict_days(test_params):
+    """
+    Test that predict_days matches the number of days run_simulation
+    simulates.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        city, the number of days contagious, and the
+        expected result
+    """
+
+    _, params = test_params
+    assert sir.predict_days(params["city"]) == params["expected"][1]
+
+
+def test_predict_days_random_cities():
+    """
+    Cross-check predict_days against run_simulation on many small
+    random cities.
+    """
+
+    rng = random.Random(sir.TEST_SEED)
+    for _ in range(500):
+        city = [(rng.choice("SSSIRV"), rng.randint(0, 3))
+                for _ in range(rng.randint(0, 15))]
+        days_contagious = rng.randint(1, 4)
+
+        _, expected = sir.run_simulation(city, days_contagious)
+        assert sir.predict_days(city) == expected, city
+
+
+@pytest.mark.parametrize("engine", sir.ENGINES)
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("run_simulation_tests.json")) +
+    list(read_config_file("vax_run_simulation_tests.json")))
+def test_run_simulation_time_series(test_params, engine):
+    """
+    Test that the recorder's daily counts match counting the people in
+    the city after every call to simulate_one_day.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        city, the number of days contagious, and the
+        expected result
+      engine (string): the simulation engine to use
+    """
+
+    _, params = test_params
+    city = params["city"]
+    days_contagious = params["days_contagious"]
+
+    expected = [sir.count_states(city)]
+    for _ in range(params["expected"][1]):
+        city = sir.simulate_one_day(city, days_contagious)
+        expected.append(sir.count_states(city))
+
+    recorder = sir.TimeSeriesRecorder()
+    sir.run_simulation(params["city"], days_contagious, engine, recorder)
+
+    assert recorder.time_series().tolist() == expected
+
+
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("run_simulation_tests.json")) +
+    list(read_config_file("vax_run_simulation_tests.json")))
+def test_run_simulation_ring_graph(test_params):
+    """
+    Test that simulating on a ring contact graph gives the same result
+    as the ring built into the simulation.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        city, the number of days contagious, and the
+        expected result
+    """
+
+    _, params = test_params
+    city = params["city"]
+    graph = ContactGraph.ring(len(city))
+
+    actual = sir.run_simulation(city, params["days_contagious"], "numpy",
+                                graph=graph)
+
+    expected = params["expected"]
+    assert actual == ([tuple(p) for p in expected[0]], expected[1])
+
+
+@pytest.mark.parametrize("num_workers", [2, 3])
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("run_simulation_tests.json")) +
+    list(read_config_file("vax_run_simulation_tests.json")))
+def test_run_simulation_chunked(test_params, num_workers):
+    """
+    Test run_simulation with the ring split across several workers.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        city, the number of days contagious, and the
+        expected result
+      num_workers (int): the number of worker processes
+    """
+
+    _, params = test_params
+
+    actual = sir.run_simulation(params["city"], params["days_contagious"],
+                                "chunked", num_workers=num_workers)
+
+    expected = params["expected"]
+    assert actual == ([tuple(p) for p in expected[0]], expected[1])
+
+
 ###### Task: vaccinate a person ######
 @pytest.mark.parametrize(
     "test_params",
@@ -639,3 +962,504 @@ def test_vaccinate_and_simulate(test_params):
     expected = params["expected"]
     expected = ([tuple(p) for p in expected[0]], expected[1])
     check_result(recreate_msg, actual, expected)
+
+
+@pytest.mark.parametrize("engine", ALT_ENGINES)
+@pytest.mark.parametrize(
+    "test_params",
+    read_config_file("vaccinate_and_simulate.json"))
+def test_vaccinate_and_simulate_engines(test_params, engine):
+    """
+    Test vax_and_simulate with the alternate engines
+
+    Args:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        augmented persons, and the expected result.
+      engine (string): the simulation engine to use
+    """
+
+    test_num, params = test_params
+    actual = sir.vaccinate_and_simulate(params["city"],
+                                        params["days_contagious"],
+                                        params["seed"],
+                                        engine)
+
+    recreate_msg = ("See the information for Task 9, Test {} to "
+                    "see how to recreate this test.")
+    recreate_msg = recreate_msg.format(test_num)
+
+    expected = params["expected"]
+    expected = ([tuple(p) for p in expected[0]], expected[1])
+    check_result(recreate_msg, actual, expected)
+
+
+@pytest.mark.parametrize(
+    "test_params",
+    read_config_file("vaccinate_and_simulate.json"))
+def test_vaccinate_and_simulate_cache(test_params, tmp_path):
+    """
+    Test that vaccinate_and_simulate returns the same results from the
+    cache as without it.
+
+    Args:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        augmented persons, and the expected result.
+    """
+
+    _, params = test_params
+    cache = sir.ResultCache(str(tmp_path))
+    expected = params["expected"]
+    expected = ([tuple(p) for p in expected[0]], expected[1])
+
+    for _ in range(2):
+        actual = sir.vaccinate_and_simulate(params["city"],
+                                            params["days_contagious"],
+                                            params["seed"], cache=cache)
+        assert actual == expected
+
+    assert len(os.listdir(str(tmp_path))) == 1
+
+
+def test_result_cache_keys_and_eviction(tmp_path):
+    """
+    Test that changing the city misses the cache and that the least
+    recently used results are evicted.
+    """
+
+    cache = sir.ResultCache(str(tmp_path), max_entries=2)
+    city = [("S", 0, 0.5), ("I", 0, 0.5), ("S", 0, 0.5)]
+    changed_city = [("S", 0, 0.5), ("I", 0, 0.5), ("S", 0, 0.6)]
+
+    key = cache.key(city, 2, 1)
+    assert cache.key(changed_city, 2, 1) != key
+    assert cache.key(city, 3, 1) != key
+    assert cache.key(city, 2, 2) != key
+
+    result = ([("I", 1), ("R", 0), ("V", 0)], 3)
+    cache.put(key, result)
+    assert cache.get(key) == result
+    assert cache.get(cache.key(changed_city, 2, 1)) is None
+
+    os.utime(os.path.join(str(tmp_path), key + ".sir"), ns=(1, 1))
+    cache.put(cache.key(city, 3, 1), result)
+    cache.put(cache.key(city, 4, 1), result)
+
+    assert cache.get(key) is None
+    assert cache.get(cache.key(city, 3, 1)) == result
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+###### Run trials in parallel ######
+@pytest.mark.parametrize(
+    "test_params",
+    read_config_file("vaccinate_city.json"))
+def test_vaccinate_city_rng(test_params):
+    """
+    Test that vaccinate_city with its own random number generator
+    matches the seeded global one and leaves the global one alone.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        a seed, a list of augmented persons, and the expected result city.
+    """
+
+    _, params = test_params
+
+    random.seed(0)
+    state = random.getstate()
+    actual = sir.vaccinate_city(params["city"], None,
+                                random.Random(params["seed"]))
+
+    assert actual == convert_city(params, "expected")
+    assert random.getstate() == state
+
+
+@pytest.mark.parametrize("num_trials", [1, 7, 20])
+def test_run_trials_parallel(num_trials):
+    """
+    Test that running the trials across processes gives the same
+    median as running them serially.
+
+    Inputs:
+      num_trials (int): the number of trials to run
+    """
+
+    city = sir.parse_city_file(
+        os.path.join(BASE_DIR, "sample_cities", "vax_city_1.txt"), True)
+
+    expected = sir.run_trials(city, 3, sir.TEST_SEED, num_trials)
+    actual = sir.run_trials(city, 3, sir.TEST_SEED, num_trials,
+                            num_workers=2)
+
+    assert actual == expected
+
+
+def test_day_counts():
+    """
+    Test that the streaming histogram finds the same order statistics
+    as sorting the results.
+    """
+
+    rng = random.Random(sir.TEST_SEED)
+    days = [rng.randrange(20) for _ in range(101)]
+
+    results = sir.DayCounts()
+    for num_days in days:
+        results.add(num_days)
+
+    assert results.total == len(days)
+    assert [results.order_statistic(k) for k in range(len(days))] == \
+        sorted(days)
+    assert results.median() == sorted(days)[len(days) // 2]
+
+    low, high = results.median_interval(0.95)
+    assert low <= results.median() <= high
+
+
+@pytest.mark.parametrize("num_trials", [1, 7, 20])
+@pytest.mark.parametrize("num_workers", [1, 3])
+def test_run_trials_adaptive_all_trials(num_trials, num_workers):
+    """
+    Test that the adaptive trials give the same median as run_trials
+    when the tolerance is never met.
+
+    Inputs:
+      num_trials (int): the number of trials to run
+      num_workers (int): the number of worker processes
+    """
+
+    city = sir.parse_city_file(
+        os.path.join(BASE_DIR, "sample_cities", "vax_city_1.txt"), True)
+
+    expected = sir.run_trials(city, 3, sir.TEST_SEED, num_trials)
+    median, (low, high), trials_run = sir.run_trials_adaptive(
+        city, 3, sir.TEST_SEED, num_trials, -1, num_workers=num_workers)
+
+    assert median == expected
+    assert low <= median <= high
+    assert trials_run == num_trials
+
+
+def test_run_trials_adaptive_stops_early():
+    """
+    Test that the adaptive trials stop after the minimum number of
+    trials when every trial takes the same number of days.
+    """
+
+    # Nobody is eager to be vaccinated, so every trial is the same.
+    city = [("S", 0, 0.0), ("I", 0, 0.0), ("S", 0, 0.0), ("S", 0, 0.0)]
+    _, expected = sir.run_simulation([(ds, d) for ds, d, _ in city], 2)
+
+    median, interval, trials_run = sir.run_trials_adaptive(
+        city, 2, sir.TEST_SEED, 1000, 0)
+
+    assert median == expected
+    assert interval == (expected, expected)
+    assert trials_run == sir.MIN_ADAPTIVE_TRIALS
+
+
+###### Loading cities ######
+@pytest.mark.parametrize("filename", ["person_city_0.txt",
+                                      "person_city_1.txt"])
+def test_load_city(filename, tmp_path):
+    """
+    Test that load_city reads text and binary city files into the same
+    people as parse_city_file.
+
+    Inputs:
+      filename (string): the name of a sample city file
+      tmp_path (Path): a temporary directory for the binary file
+    """
+
+    text_filename = os.path.join(BASE_DIR, "sample_cities", filename)
+    expected = sir.parse_city_file(text_filename, False)
+
+    city = sir.load_city(text_filename)
+    assert city.to_tuples() == expected
+
+    binary_filename = str(tmp_path / "city.bin")
+    sir.save_city_file(city, binary_filename)
+    assert sir.is_binary_city_file(binary_filename)
+    assert sir.load_city(binary_filename).to_tuples() == expected
+    assert sir.parse_city_file(binary_filename, False) == expected
+
+    # Simulating a memory-mapped city must not change the file.
+    assert sir.load_city(binary_filename).run(2) == \
+        sir.run_simulation(expected, 2)[1]
+    assert sir.load_city(binary_filename).to_tuples() == expected
+
+
+def test_load_city_invalid(tmp_path):
+    """
+    Test that load_city rejects malformed text and binary files.
+
+    Inputs:
+      tmp_path (Path): a temporary directory for the files
+    """
+
+    text_filename = tmp_path / "city.txt"
+    text_filename.write_text("S 0\nX 1\n")
+    assert sir.load_city(str(text_filename)) is None
+
+    binary_filename = tmp_path / "city.bin"
+    binary_filename.write_bytes(sir.CITY_FILE_MAGIC + b"\x05")
+    assert sir.load_city(str(binary_filename)) is None
+
+    assert sir.load_city(str(tmp_path / "missing.txt")) is None
+
+
+###### Batch vaccination ######
+@pytest.mark.parametrize(
+    "test_params",
+    read_config_file("vaccinate_and_simulate.json"))
+def test_vaccinate_and_simulate_batch(test_params):
+    """
+    Test that every scenario in vaccinate_and_simulate_batch matches
+    vaccinate_and_simulate with the same seed and scaled eagerness.
+
+    Args:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        augmented persons, and the expected result.
+    """
+
+    _, params = test_params
+    city = params["city"]
+    days_contagious = params["days_contagious"]
+    seeds = [params["seed"], params["seed"] + 1, 7]
+    scales = [0.0, 0.5, 1.0, 2.0]
+
+    actual = sir.vaccinate_and_simulate_batch(city, days_contagious,
+                                              seeds, scales)
+
+    assert actual.shape == (len(seeds), len(scales))
+    for i, seed in enumerate(seeds):
+        for j, scale in enumerate(scales):
+            scaled_city = [(ds, d, e * scale) for ds, d, e in city]
+            _, expected = sir.vaccinate_and_simulate(scaled_city,
+                                                     days_contagious, seed)
+            assert actual[i, j] == expected
+
+
+###### Parameter sweeps ######
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_run_sweep(num_workers, tmp_path):
+    """
+    Test that every sweep point matches run_trials with the same
+    parameters, and that the results table can be saved.
+
+    Inputs:
+      num_workers (int): the number of worker processes
+      tmp_path (Path): a temporary directory for the results
+    """
+
+    city = sir.parse_city_file(
+        os.path.join(BASE_DIR, "sample_cities", "vax_city_1.txt"), True)
+
+    rows = sir.run_sweep(city, [2, 3], [sir.TEST_SEED, 5], [1, 6],
+                         num_workers)
+
+    assert len(rows) == 8
+    for days_contagious, seed, num_trials, median_days in rows:
+        assert median_days == sir.run_trials(city, days_contagious, seed,
+                                             num_trials)
+
+    sir.save_sweep(rows, str(tmp_path / "sweep.csv"))
+    with open(tmp_path / "sweep.csv") as f:
+        assert f.readline().strip() == ",".join(sir.SWEEP_COLUMNS)
+        assert len(f.readlines()) == len(rows)
+
+
+def test_parse_int_range():
+    """
+    Test the parsing of integer lists and ranges on the command line.
+    """
+
+    assert sir.parse_int_range("3") == [3]
+    assert sir.parse_int_range("1:4,10") == [1, 2, 3, 4, 10]
+    assert sir.parse_int_range("2:8:3") == [2, 5, 8]
+
+
+###### Checkpoints ######
+@pytest.mark.parametrize(
+    "test_params",
+    list(read_config_file("run_simulation_tests.json")) +
+    list(read_config_file("vax_run_simulation_tests.json")))
+def test_resume_from_checkpoint(test_params, tmp_path):
+    """
+    Test that a simulation stopped after its first day and resumed from
+    a checkpoint ends exactly like an uninterrupted one.
+
+    Inputs:
+      test_params (int, dictionary): the test number and the test
+      parameters dictionary:
+        city, the number of days contagious, and the
+        expected result
+      tmp_path (Path): a temporary directory for the checkpoint
+    """
+
+    _, params = test_params
+    days_contagious = params["days_contagious"]
+    filename = str(tmp_path / "checkpoint.bin")
+
+    city = sir.City.from_tuples(params["city"])
+    days_passed = 0
+    if city.is_transmission_possible():
+        city.step(days_contagious)
+        days_passed = 1
+    sir.save_checkpoint(city, days_passed, days_contagious, filename)
+
+    city, days_passed, saved_days_contagious = sir.load_checkpoint(filename)
+    assert days_passed == min(1, params["expected"][1])
+    assert saved_days_contagious == days_contagious
+
+    num_days = sir.run_with_checkpoints(city, days_contagious, filename, 1,
+                                        days_passed)
+
+    expected = params["expected"]
+    assert (city.to_tuples(), num_days) == \
+        ([tuple(p) for p in expected[0]], expected[1])
+
+    # The last checkpoint holds the final city.
+    if num_days > days_passed:
+        city, days_passed, _ = sir.load_checkpoint(filename)
+        assert (city.to_tuples(), days_passed) == \
+            ([tuple(p) for p in expected[0]], expected[1])
+    assert not os.path.exists(filename + ".tmp")
+
+
+def run_cmd(args):
+    """
+    Run the command-line interface.
+
+    Inputs:
+      args (list of strings): the command-line arguments
+
+    Returns (int, string): the return value of cmd and its output
+    """
+
+    result = CliRunner().invoke(sir.cmd, args, standalone_mode=False)
+    assert result.exception is None
+
+    return result.return_value, result.output
+
+
+def test_cmd_resume(tmp_path):
+    """
+    Test that resuming from the checkpoints saved on the command line
+    ends like an uninterrupted run.
+
+    Inputs:
+      tmp_path (Path): a temporary directory for the checkpoint
+    """
+
+    filename = os.path.join(BASE_DIR, "sample_cities", "person_city_1.txt")
+    checkpoint = str(tmp_path / "checkpoint.bin")
+
+    rv, expected = run_cmd([filename])
+    assert rv == 0
+    final_lines = expected.splitlines()[-2:]
+
+    rv, output = run_cmd([filename, "--checkpoint", checkpoint,
+                          "--checkpoint-every", "1"])
+    assert rv == 0
+    assert output.splitlines()[-2:] == final_lines
+
+    rv, output = run_cmd([filename, "--checkpoint", checkpoint, "--resume"])
+    assert rv == 0
+    assert "Resuming simulation after day" in output
+    assert output.splitlines()[-2:] == final_lines
+
+    # Resume from a checkpoint saved partway through.
+    city = sir.load_city(filename)
+    city.step(2)
+    sir.save_checkpoint(city, 1, 2, checkpoint)
+    rv, output = run_cmd([filename, "--checkpoint", checkpoint, "--resume"])
+    assert rv == 0
+    assert "Resuming simulation after day 1" in output
+    assert output.splitlines()[-2:] == final_lines
+
+
+def test_cmd_resume_days_contagious(tmp_path):
+    """
+    Test that resuming with a different number of days contagious than
+    the checkpoint was saved with is rejected.
+
+    Inputs:
+      tmp_path (Path): a temporary directory for the checkpoint
+    """
+
+    filename = os.path.join(BASE_DIR, "sample_cities", "person_city_1.txt")
+    checkpoint = str(tmp_path / "checkpoint.bin")
+
+    rv, _ = run_cmd([filename, "--checkpoint", checkpoint,
+                     "--checkpoint-every", "1"])
+    assert rv == 0
+
+    rv, output = run_cmd([filename, "--checkpoint", checkpoint, "--resume",
+                          "--days-contagious", "3"])
+    assert rv == -1
+    assert "Final city" not in output
+
+
+def test_cmd_resume_without_checkpoint():
+    """
+    Test that --resume is rejected without --checkpoint.
+    """
+
+    filename = os.path.join(BASE_DIR, "sample_cities", "person_city_1.txt")
+
+    rv, output = run_cmd([filename, "--resume"])
+    assert rv == -1
+    assert "Final city" not in output
+
+
+###### Profiling ######
+def test_profiling():
+    """
+    Test that profiling counts the calls to the hot functions and
+    restores them afterwards.
+    """
+
+    city = sir.parse_city_file(
+        os.path.join(BASE_DIR, "sample_cities", "person_city_1.txt"), False)
+    originals = (sir.has_an_infected_neighbor, sir.simulate_one_day,
+                 sir.City.step, sir.RunLengthCity.next_day)
+
+    with sir.profiling() as profile:
+        _, num_days = sir.run_simulation(city, 2)
+        sir.simulate_one_day(city, 2)
+        sir.run_simulation(city, 2, "compact")
+        sir.run_simulation(city, 2, "runs")
+
+    assert profile.calls["is_transmission_possible"] == 1
+    assert profile.calls["simulate_one_day_fused"] == num_days
+    assert profile.calls["simulate_one_day"] == 1
+    assert profile.calls["advance_person_at_location"] == len(city)
+    assert profile.calls["City.step"] == num_days
+    assert profile.calls["RunLengthCity.next_day"] == num_days
+    assert profile.calls["RunLengthCity.is_transmission_possible"] == \
+        num_days + 1
+    assert len(profile.day_seconds) == 3 * num_days + 1
+    assert "simulate_one_day_fused" in profile.summary()
+
+    assert (sir.has_an_infected_neighbor, sir.simulate_one_day,
+            sir.City.step, sir.RunLengthCity.next_day) == originals
+
+
+def test_profiling_chunked():
+    """
+    Test that profiling times every day of the chunked engine.
+    """
+
+    city = sir.parse_city_file(
+        os.path.join(BASE_DIR, "sample_cities", "person_city_1.txt"), False)
+
+    with sir.profiling() as profile:
+        _, num_days = sir.run_simulation(city, 2, "chunked", num_workers=2)
+
+    assert profile.calls["simulate_one_day_chunked"] == num_days
+    assert len(profile.day_seconds) == num_days
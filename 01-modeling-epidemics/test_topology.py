@@ -0,0 +1,73 @@
+'''
+Test code for the contact graphs used in Modeling Epidemics
+'''
+
+import numpy as np
+import pytest
+
+import sir
+from topology import ContactGraph
+
+# pylint: disable-msg= missing-docstring
+
+
+def neighbors(graph, person):
+    '''
+    Get the sorted neighbors of a person in a contact graph.
+    '''
+    return sorted(graph.indices[graph.indptr[person]:
+                                graph.indptr[person + 1]].tolist())
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 10])
+def test_ring(size):
+    graph = ContactGraph.ring(size)
+
+    assert len(graph) == size
+    for person in range(size):
+        assert neighbors(graph, person) == \
+            sorted([(person - 1) % size, (person + 1) % size])
+
+
+def test_lattice():
+    graph = ContactGraph.lattice(3, 4)
+
+    assert neighbors(graph, 0) == [1, 4]
+    assert neighbors(graph, 5) == [1, 4, 6, 9]
+    assert neighbors(graph, 11) == [7, 10]
+
+    torus = ContactGraph.lattice(3, 4, wrap=True)
+    assert neighbors(torus, 0) == [1, 3, 4, 8]
+
+
+def test_from_edges():
+    graph = ContactGraph.from_edges(5, [(0, 1), (1, 2), (4, 1)])
+
+    assert [neighbors(graph, person) for person in range(5)] == \
+        [[1], [0, 2, 4], [1], [], [1]]
+
+    mask = np.array([[True, False, True, False, False],
+                     [False, False, False, False, False]])
+    assert graph.neighbor_counts(mask).tolist() == \
+        [[0, 2, 0, 0, 0], [0, 0, 0, 0, 0]]
+
+
+def test_run_simulation_lattice():
+    # An infection in the middle of a 3 x 3 lattice reaches the sides
+    # on day 1 and the corners on day 2.
+    city = [('S', 0)] * 9
+    city[4] = ('I', 0)
+
+    final_city, num_days = sir.run_simulation(
+        city, 3, "numpy", graph=ContactGraph.lattice(3, 3))
+
+    assert num_days == 2
+    assert final_city == [('I', 0), ('I', 1), ('I', 0),
+                          ('I', 1), ('I', 2), ('I', 1),
+                          ('I', 0), ('I', 1), ('I', 0)]
+
+
+def test_run_simulation_graph_size_mismatch():
+    with pytest.raises(ValueError):
+        sir.run_simulation([('I', 0), ('S', 0)], 2, "numpy",
+                           graph=ContactGraph.ring(3))
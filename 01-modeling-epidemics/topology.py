@@ -0,0 +1,169 @@
+'''
+Contact graphs for epidemic modelling
+
+Neighborhoods for the simulation stored as an adjacency matrix in
+compressed sparse row (CSR) form: the neighbors of person i are
+indices[indptr[i]:indptr[i + 1]].  Finding everyone with an infected
+neighbor is then a single sparse matrix-vector product.
+'''
+
+import numpy as np
+
+
+class ContactGraph:
+    '''
+    Class for representing who is in contact with whom.
+
+    Attributes:
+        indptr (array): for each person, where their neighbors start in
+          indices, plus the total number of entries at the end
+        indices (array): the neighbors of every person, one person
+          after another
+
+    Methods:
+        ring(size): ContactGraph
+            the ring used by sir.py
+        lattice(num_rows, num_cols, wrap): ContactGraph
+            a 2-D lattice where people touch up, down, left and right
+        from_edges(size, edges): ContactGraph
+            an arbitrary network from a list of contacts
+        neighbor_counts(mask): array
+            how many neighbors of each person are in a set of people
+        has_neighbor(mask): array
+            does each person have a neighbor in a set of people
+    '''
+
+    __slots__ = ('indptr', 'indices')
+
+    def __init__(self, indptr, indices):
+        '''
+        Construct a contact graph from CSR arrays.
+
+        Args:
+            indptr (array): the row pointers, of length size + 1
+            indices (array): the column indices (the neighbors)
+        '''
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+
+        assert indptr.ndim == 1 and len(indptr) > 0 and indptr[0] == 0
+        assert indptr[-1] == len(indices)
+        assert np.all(np.diff(indptr) >= 0)
+        assert len(indices) == 0 or \
+            (indices.min() >= 0 and indices.max() < len(indptr) - 1)
+
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def ring(cls, size):
+        '''
+        Build the ring in which person i is in contact with persons
+        i - 1 and i + 1, wrapping around at the ends.
+
+        Args:
+            size (int): the number of people
+
+        Returns (ContactGraph): the ring
+        '''
+        people = np.arange(size, dtype=np.int64)
+        indices = np.column_stack([(people - 1) % max(size, 1),
+                                   (people + 1) % max(size, 1)]).ravel()
+
+        return cls(np.arange(0, 2 * size + 1, 2), indices)
+
+    @classmethod
+    def lattice(cls, num_rows, num_cols, wrap=False):
+        '''
+        Build a 2-D lattice in which every person is in contact with the
+        people above, below, left and right of them.  Person (i, j) is
+        number i * num_cols + j.
+
+        Args:
+            num_rows (int): the number of rows
+            num_cols (int): the number of columns
+            wrap (boolean): if True, the edges wrap around (a torus)
+
+        Returns (ContactGraph): the lattice
+        '''
+        rows, cols = np.divmod(np.arange(num_rows * num_cols), num_cols)
+        sources = []
+        targets = []
+
+        for row_step, col_step in ((0, 1), (1, 0)):
+            neighbor_rows = rows + row_step
+            neighbor_cols = cols + col_step
+            if wrap:
+                neighbor_rows %= num_rows
+                neighbor_cols %= num_cols
+                keep = np.ones(len(rows), dtype=bool)
+            else:
+                keep = (neighbor_rows < num_rows) & (neighbor_cols < num_cols)
+            sources.append((rows * num_cols + cols)[keep])
+            targets.append((neighbor_rows * num_cols + neighbor_cols)[keep])
+
+        edges = np.column_stack([np.concatenate(sources),
+                                 np.concatenate(targets)])
+
+        return cls.from_edges(num_rows * num_cols, edges)
+
+    @classmethod
+    def from_edges(cls, size, edges):
+        '''
+        Build a contact network from a list of contacts.  Contacts go
+        both ways, so each pair only needs to be listed once.
+
+        Args:
+            size (int): the number of people
+            edges (array or list of (int, int) pairs): the contacts
+
+        Returns (ContactGraph): the network
+        '''
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        sources = np.concatenate([edges[:, 0], edges[:, 1]])
+        targets = np.concatenate([edges[:, 1], edges[:, 0]])
+
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=size), out=indptr[1:])
+
+        return cls(indptr, targets[order])
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def neighbor_counts(self, mask):
+        '''
+        Count how many neighbors of each person are in a set of people,
+        the product of the adjacency matrix with the set's indicator
+        vector.
+
+        Args:
+            mask (array of booleans): True for the people in the set.
+              With more than one dimension, the last axis is the people
+              and the others are independent scenarios.
+
+        Returns (array of ints): the count for each person, with the
+          same shape as mask.
+        '''
+        # Sum each person's slice of the gathered values through the
+        # differences of a running total, which handles people with no
+        # neighbors.
+        gathered = np.asarray(mask)[..., self.indices].astype(np.int64)
+        totals = np.zeros(gathered.shape[:-1] + (len(self.indices) + 1,),
+                          dtype=np.int64)
+        np.cumsum(gathered, axis=-1, out=totals[..., 1:])
+
+        return totals[..., self.indptr[1:]] - totals[..., self.indptr[:-1]]
+
+    def has_neighbor(self, mask):
+        '''
+        Does each person have at least one neighbor in a set of people?
+
+        Args:
+            mask (array of booleans): True for the people in the set
+              (see neighbor_counts)
+
+        Returns (array of booleans): the answer for each person
+        '''
+        return self.neighbor_counts(mask) > 0
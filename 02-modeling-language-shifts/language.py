@@ -20,10 +20,14 @@ Example use:
     $ python3 language.py -grid_file tests/writeup-grid-with-cc.txt
 	  --r 2 --a 0.5 --b 0.9 --c 1.2 --max_steps 5
 While shown on two lines, the above should be entered as a single command.
+Add --synchronous to update every home at once with NumPy instead.
 """
 
-import copy
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import click
+import numpy as np
 import utility
 
 def is_sl_within_community_center(grid, centers, location):
@@ -56,6 +60,42 @@ def is_sl_within_community_center(grid, centers, location):
     return False 
 
 
+def community_center_coverage(size, centers):
+    """
+    Rasterizes the service areas of the community centers.
+
+    Inputs:
+        size (int): the number of rows (and columns) in the grid
+
+        centers (list of tuples): inside each element of the list, there is
+        a tuple with row (i) and column (j) of the center location, the
+        second element is the distance (d) serviced by the center.
+
+    Returns (2-D array of booleans): True for the locations serviced by
+    at least one community center.
+    """
+    # Mark the corners of each square in a difference table; the running
+    # sums over both axes then count the centers covering each location.
+    difference = np.zeros((size + 1, size + 1), dtype=np.int64)
+
+    for ((center_row, center_column), d) in centers:
+        lb_row = max(0, center_row - d)
+        ub_row = min(center_row + d + 1, size)
+        lb_col = max(0, center_column - d)
+        ub_col = min(center_column + d + 1, size)
+        if lb_row >= ub_row or lb_col >= ub_col:
+            continue
+
+        difference[lb_row, lb_col] += 1
+        difference[lb_row, ub_col] -= 1
+        difference[ub_row, lb_col] -= 1
+        difference[ub_row, ub_col] += 1
+
+    coverage = np.cumsum(np.cumsum(difference, axis=0), axis=1)
+
+    return coverage[:size, :size] > 0
+
+
 def engagement_level(grid, location, R):
     """
     Computes the language engagement level of a location (home).
@@ -89,7 +129,133 @@ def engagement_level(grid, location, R):
 
     return sum / total_homes
 
-def transmission_next_generation(grid, location, thresholds, R, centers):
+
+# Neighborhoods with at least this many homes are summed with an
+# EngagementIndex; smaller ones are cheaper to add up directly.
+INDEX_MIN_NEIGHBORHOOD = 121
+
+
+class EngagementIndex:
+    """
+    Class for answering neighborhood sums over a grid that changes one
+    location at a time, backed by a 2-D Fenwick tree: both a sum over a
+    rectangle and an update of a single location take O(log^2 N)
+    operations, however large the neighborhood.
+
+    Methods:
+        prefix_sum(i, j): int
+            the sum of the locations above and to the left of (i, j)
+        add(location, delta): change the value at a location
+        engagement_level(location, R): float
+            the engagement level of a location (see engagement_level)
+    """
+
+    __slots__ = ('size', 'tree')
+
+    def __init__(self, grid):
+        """
+        Build the index for a grid in O(N^2).
+
+        Inputs:
+            grid (list of lists): the grid
+        """
+        size = len(grid)
+        tree = [[0] * (size + 1)]
+        for row in grid:
+            tree.append([0] + list(row))
+
+        # Push every partial sum up to its parent, first along the rows
+        # and then along the columns.
+        for tree_row in tree:
+            for j in range(1, size + 1):
+                parent = j + (j & -j)
+                if parent <= size:
+                    tree_row[parent] += tree_row[j]
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                parent_row = tree[parent]
+                for j, value in enumerate(tree[i]):
+                    parent_row[j] += value
+
+        self.size = size
+        self.tree = tree
+
+    def prefix_sum(self, i, j):
+        """
+        Sums the locations in rows 0 to i - 1 and columns 0 to j - 1.
+
+        Inputs:
+            i (int): the number of rows to sum
+            j (int): the number of columns to sum
+
+        Returns (int): the sum
+        """
+        tree = self.tree
+        total = 0
+        while i > 0:
+            tree_row = tree[i]
+            column = j
+            while column > 0:
+                total += tree_row[column]
+                column -= column & -column
+            i -= i & -i
+
+        return total
+
+    def add(self, location, delta):
+        """
+        Records a change to the value at a location.
+
+        Inputs:
+            location (tuple): tuple of two integers, the first determines
+            the row and the second the column of the location.
+
+            delta (int): the change in value
+        """
+        i, j = location
+        size = self.size
+        tree = self.tree
+
+        i += 1
+        while i <= size:
+            tree_row = tree[i]
+            column = j + 1
+            while column <= size:
+                tree_row[column] += delta
+                column += column & -column
+            i += i & -i
+
+    def engagement_level(self, location, R):
+        """
+        Computes the language engagement level of a location (home).
+
+        Inputs:
+            location (tuple): tuple of two integers, the first determines
+            the row and the second the column of the location.
+
+            R (int): the radius of the neighborhood
+
+        Returns (float): engagement level of the location, the same value
+        engagement_level computes.
+        """
+        i, j = location
+        lb_row = max(0, i - R)
+        ub_row = min(i + R + 1, self.size)
+        lb_col = max(0, j - R)
+        ub_col = min(j + R + 1, self.size)
+
+        total = (self.prefix_sum(ub_row, ub_col)
+                 - self.prefix_sum(lb_row, ub_col)
+                 - self.prefix_sum(ub_row, lb_col)
+                 + self.prefix_sum(lb_row, lb_col))
+
+        return total / ((ub_row - lb_row) * (ub_col - lb_col))
+
+
+def transmission_next_generation(  # pylint: disable=too-many-arguments
+        grid, location, thresholds, R, centers, index=None, coverage=None,
+        grid_hash=None):
     """
     Computes a location's language preference transmission to the next generation
     (from parents to children in a given location).
@@ -108,14 +274,31 @@ def transmission_next_generation(grid, location, thresholds, R, centers):
         centers (list of tuples): inside each element of the list, there is 
         a tuple with row (i) and column (j) of the center location, the 
         second element is the distance (d) serviced by the center.
+
+        index (EngagementIndex): an optional index of the grid, used to
+        compute the engagement level and kept up to date when the
+        location changes.
+
+        coverage (list of lists of booleans): an optional coverage mask
+        (see community_center_coverage), used instead of checking every
+        center.
+
+        grid_hash (GridHash): an optional hash of the grid, kept up to
+        date when the location changes.
     """
     i, j = location
     A, B, C = thresholds
-    E = engagement_level(grid, location, R)
+    previous_state = grid[i][j]
+    if index is None:
+        E = engagement_level(grid, location, R)
+    else:
+        E = index.engagement_level(location, R)
     
     # The function is_sl_within_community center needs to be called only 
     # for SL speaking locations.
-    if grid[i][j] >= 1:
+    if grid[i][j] >= 1 and coverage is not None:
+        condition = coverage[i][j]
+    elif grid[i][j] >= 1:
         condition = is_sl_within_community_center(grid, centers, location)
 
     # Applying transmission conditions according to tresholds A, B, C.
@@ -135,8 +318,174 @@ def transmission_next_generation(grid, location, thresholds, R, centers):
             grid[i][j] = 0
         elif A < E < B:
             grid[i][j] = 1
-    
-def change_in_step_simulation(grid, threshold, R, centers):
+
+    if index is not None and grid[i][j] != previous_state:
+        index.add(location, grid[i][j] - previous_state)
+    if grid_hash is not None and grid[i][j] != previous_state:
+        grid_hash.add(location, previous_state, grid[i][j])
+
+class ActiveCells:
+    """
+    Class for keeping track of the locations whose next generation may
+    differ from their current state.  A location only needs to be
+    evaluated again once a location in its neighborhood (itself
+    included) has changed since it was last evaluated, so every change
+    marks the (2R + 1) x (2R + 1) square around it.  Marks made during a
+    step are picked up later in the same step when they fall after the
+    current location, and in the next step otherwise, which keeps the
+    in-place update order exact.
+
+    Attributes:
+        active (list of lists of booleans): True for the locations that
+          need to be evaluated
+        row_counts (list of ints): the number of active locations in
+          each row
+
+    Methods:
+        pop(location): boolean
+            is a location active?  It is no longer active afterwards.
+        mark(location, R): make the neighborhood of a location active
+    """
+
+    __slots__ = ('active', 'row_counts')
+
+    def __init__(self, size):
+        """
+        Start with every location active.
+
+        Inputs:
+            size (int): the number of rows (and columns) in the grid
+        """
+        self.active = [[True] * size for _ in range(size)]
+        self.row_counts = [size] * size
+
+    def pop(self, location):
+        """
+        Checks whether a location needs to be evaluated, and clears it.
+
+        Inputs:
+            location (tuple): tuple of two integers, the first determines
+            the row and the second the column of the location.
+
+        Returns (boolean): True if the location was active
+        """
+        i, j = location
+        if not self.active[i][j]:
+            return False
+
+        self.active[i][j] = False
+        self.row_counts[i] -= 1
+        return True
+
+    def mark(self, location, R):
+        """
+        Makes every location in the neighborhood of a changed location
+        active.
+
+        Inputs:
+            location (tuple): tuple of two integers, the first determines
+            the row and the second the column of the location.
+
+            R (int): the radius of the neighborhood
+        """
+        i, j = location
+        size = len(self.active)
+        lb_col = max(0, j - R)
+        ub_col = min(j + R + 1, size)
+
+        for row in range(max(0, i - R), min(i + R + 1, size)):
+            active_row = self.active[row]
+            for column in range(lb_col, ub_col):
+                if not active_row[column]:
+                    active_row[column] = True
+                    self.row_counts[row] += 1
+
+
+# Cycles longer than one step are only confirmed once the grid has
+# been through one twice, which takes at least this many steps.
+HASH_MIN_STEPS = 4
+
+MASK_64 = (1 << 64) - 1
+
+
+def location_key(number):
+    """
+    Computes the random-looking 64-bit key of a location and language
+    state with the splitmix64 mix.
+
+    Inputs:
+        number (int): (i * N + j) * 3 + state for a state at location
+        (i, j) of an N x N grid
+
+    Returns (int): the key
+    """
+    key = (number + 0x9E3779B97F4A7C15) & MASK_64
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & MASK_64
+
+    return key ^ (key >> 31)
+
+
+class GridHash:
+    """
+    Class for keeping a 64-bit hash of the language states of a grid
+    that changes one location at a time.  Every location has a key for
+    each language state (see location_key), and the hash is the XOR of
+    the keys of the current states, so a change is folded in with two
+    XORs instead of hashing the whole grid again.  Different grids can
+    share a hash, so a repeated hash is only a hint that the grid
+    repeated.
+
+    Attributes:
+        size (int): the number of rows (and columns) in the grid
+        value (int): the hash of the current grid
+
+    Methods:
+        add(location, old, new): record a change to a location
+    """
+
+    __slots__ = ('size', 'value')
+
+    def __init__(self, grid):
+        """
+        Hash the grid, mixing the keys of every location at once with
+        NumPy.
+
+        Inputs:
+            grid (list of lists): the grid
+        """
+        size = len(grid)
+        key = np.arange(size * size, dtype=np.uint64) * np.uint64(3)
+        key += np.array(grid, dtype=np.uint64).reshape(-1)
+        key += np.uint64(0x9E3779B97F4A7C15)
+        key ^= key >> np.uint64(30)
+        key *= np.uint64(0xBF58476D1CE4E5B9)
+        key ^= key >> np.uint64(27)
+        key *= np.uint64(0x94D049BB133111EB)
+        key ^= key >> np.uint64(31)
+
+        self.size = size
+        self.value = int(np.bitwise_xor.reduce(key)) if size else 0
+
+    def add(self, location, old, new):
+        """
+        Records a change to the language state of a location.
+
+        Inputs:
+            location (tuple): tuple of two integers, the first determines
+            the row and the second the column of the location.
+
+            old (int): the language state before the change
+            new (int): the language state after the change
+        """
+        i, j = location
+        number = (i * self.size + j) * 3
+        self.value ^= location_key(number + old) ^ location_key(number + new)
+
+
+def change_in_step_simulation(  # pylint: disable=too-many-arguments
+        grid, threshold, R, centers, index=None, coverage=None, active=None,
+        grid_hash=None):
     """
     Determines if there is a change in language state when taking a
     step in the language shift simulation.
@@ -151,6 +500,19 @@ def change_in_step_simulation(grid, threshold, R, centers):
 
         a tuple with row (i) and column (j) of the center location, the 
         second element is the distance (d) serviced by the center.
+
+        index (EngagementIndex): an optional index of the grid (see
+        transmission_next_generation)
+
+        coverage (list of lists of booleans): an optional coverage mask
+        (see transmission_next_generation)
+
+        active (ActiveCells): if given, only the active locations are
+        evaluated, and the neighborhoods of the locations that change
+        are made active.
+
+        grid_hash (GridHash): an optional hash of the grid (see
+        transmission_next_generation)
     
     Returns (boolean): True if a change in language states happened
     in one step of the simulation.
@@ -160,8 +522,16 @@ def change_in_step_simulation(grid, threshold, R, centers):
     previous_grid = grid
     
     for i, row in enumerate(grid):
+        if active is not None and not active.row_counts[i]:
+            continue
         for j, _ in enumerate(row):
-            transmission_next_generation(grid, (i, j), threshold, R, centers)
+            if active is not None and not active.pop((i, j)):
+                continue
+            state = grid[i][j]
+            transmission_next_generation(grid, (i, j), threshold, R, centers,
+                                         index, coverage, grid_hash)
+            if active is not None and grid[i][j] != state:
+                active.mark((i, j), R)
             if grid[i][j] != previous_grid[i][j]:
                 change_happened = True
             else:
@@ -170,12 +540,34 @@ def change_in_step_simulation(grid, threshold, R, centers):
     return change_happened
 
 
-def run_simulation(grid, R, thresholds, centers, max_steps):
+def grid_digest(grid):
     """
-    Do the simulation.
+    Computes a digest of the language states of a grid, so that grid
+    states can be remembered without keeping copies of them.
 
     Inputs:
-      grid (list of lists of ints): the grid
+        grid (list of lists): the grid
+
+    Returns (bytes): the digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for row in grid:
+        digest.update(bytes(row))
+
+    return digest.digest()
+
+
+def simulate_steps(grid, R, thresholds, centers, max_steps):
+    """
+    Take the steps of the simulation, stopping early once the grid
+    returns to an earlier state.  The updates only depend on the grid,
+    so from then on it cycles through the same states, and the grid
+    after max_steps steps is reached by taking the few steps needed to
+    land on the right state of the cycle.  A grid that no longer
+    changes is a cycle of length 1.
+
+    Inputs:
+      grid (list of lists of ints): the grid, updated in place
       R (int): neighborhood radius
       thresholds (float, float, float): the language
         state transition thresholds (A, B, C)
@@ -183,19 +575,101 @@ def run_simulation(grid, R, thresholds, centers, max_steps):
         region
       max_steps (int): maximum number of steps
 
-    Returns (tuple): the frequency of each language state (int, int, int)
+    Returns (tuple): the number of steps actually taken (int) and the
+      length of the cycle (int), or None if the grid did not repeat.
     """
-    A, B, C = thresholds
     number_steps = 0
     change_happened = False
 
+    # Large neighborhoods are summed with an index that is updated as
+    # homes change, rather than added up home by home.
+    index = None
+    if (2 * R + 1) ** 2 >= INDEX_MIN_NEIGHBORHOOD:
+        index = EngagementIndex(grid)
+
+    # Centers never move, so which homes they service is worked out once.
+    coverage = community_center_coverage(len(grid), centers).tolist()
+
+    # Only homes near a change are evaluated again.  Once the grid
+    # settles the remaining steps have no active homes and cost nothing.
+    # A change always marks its own home, so a step leaves no active
+    # homes exactly when it changed nothing.
+    active = ActiveCells(len(grid))
+
+    # The hash is updated as homes change, so remembering the grid
+    # state costs nothing per step.  The step at which each hash was
+    # seen is kept, and the whole grid is only digested once a hash
+    # repeats, to rule out two grids sharing a hash.  Runs too short to
+    # confirm a cycle skip the hash.
+    grid_hash = None
+    if max_steps >= HASH_MIN_STEPS:
+        grid_hash = GridHash(grid)
+        seen = {grid_hash.value: 0}
+        digests = {}
+
     # Run the simulation until the maximum number of steps is reached
     # or there is no change in the language state of any location.
-    for i in range(max_steps):
-        if not change_happened:
-            number_steps += 1 
-            change_happened = change_in_step_simulation(grid, thresholds, R, centers)
-       
+    while number_steps < max_steps and not change_happened:
+        number_steps += 1
+        change_happened = change_in_step_simulation(grid, thresholds, R,
+                                                    centers, index,
+                                                    coverage, active,
+                                                    grid_hash)
+
+        # A step that changes no home leaves the grid where it was.
+        if not any(active.row_counts):
+            return number_steps, 1
+
+        if grid_hash is None:
+            continue
+        if grid_hash.value not in seen:
+            seen[grid_hash.value] = number_steps
+            continue
+
+        digest = grid_digest(grid)
+        if digest in digests:
+            cycle_length = number_steps - digests[digest]
+            for _ in range((max_steps - number_steps) % cycle_length):
+                number_steps += 1
+                change_in_step_simulation(grid, thresholds, R, centers,
+                                          index, coverage, active)
+            return number_steps, cycle_length
+        digests[digest] = number_steps
+
+    return number_steps, None
+
+
+def run_simulation(grid, R, thresholds, centers, max_steps):
+    """
+    Do the simulation.
+
+    Inputs:
+      grid (list of lists of ints): the grid
+      R (int): neighborhood radius
+      thresholds (float, float, float): the language
+        state transition thresholds (A, B, C)
+      centers (list of tuples): a list of community centers in the
+        region
+      max_steps (int): maximum number of steps
+
+    Returns (tuple): the frequency of each language state (int, int, int)
+    """
+    # Grids that settle or cycle are not stepped all the way to
+    # max_steps (see simulate_steps), but end in the same state.
+    simulate_steps(grid, R, thresholds, centers, max_steps)
+
+    return grid, language_state_frequencies(grid)
+
+
+def language_state_frequencies(grid):
+    """
+    Counts the homes in each language state.
+
+    Inputs:
+      grid (list of lists of ints): the grid
+
+    Returns (tuple): the frequency of each language state (int, int, int)
+    """
     # Create a list to keep track of language state counts.
     home_counts = [0]*3
     
@@ -208,10 +682,38 @@ def run_simulation(grid, R, thresholds, centers, max_steps):
             elif column == 2:
                 home_counts[2]+= 1
          
-    return grid, tuple(home_counts)
+    return tuple(home_counts)
     
 
-def simulation_sweep(grid, R, A, Bs, C, centers, max_steps):
+# The grid shared with the worker processes of a parallel sweep, and the
+# shared memory block that holds it.
+_SWEEP_BLOCK = None
+_SWEEP_ARGS = None
+
+
+def _init_sweep_worker(name, size, R, A, C, centers, max_steps):
+    """
+    Attach a worker process to the grid shared by simulation_sweep.
+    """
+    global _SWEEP_BLOCK, _SWEEP_ARGS  # pylint: disable=global-statement
+    _SWEEP_BLOCK = shared_memory.SharedMemory(name=name)
+    region = np.ndarray((size, size), np.uint8, buffer=_SWEEP_BLOCK.buf)
+    _SWEEP_ARGS = (region, R, A, C, centers, max_steps)
+
+
+def _run_sweep_threshold(B):
+    """
+    Run the simulation for one threshold B on a copy of the shared grid.
+    """
+    region, R, A, C, centers, max_steps = _SWEEP_ARGS
+    _, freqs = run_simulation(region.tolist(), R, (A, B, C), centers,
+                              max_steps)
+
+    return freqs
+
+
+def simulation_sweep(grid, R, A, Bs, C, centers, max_steps,
+                     num_workers=1):  # pylint: disable=too-many-arguments
     """
     Run the simulation with various values of threshold B.
 
@@ -225,20 +727,150 @@ def simulation_sweep(grid, R, A, Bs, C, centers, max_steps):
       centers (list of tuples): a list of community centers in the
         region
       max_steps (int): maximum number of steps
+      num_workers (int): the number of processes to spread the
+        thresholds across.  The grid is copied into shared memory once
+        and every worker simulates its own copy of it.
 
     Returns: a list of frequencies (tuples) of language states for
       each threshold B.
     """
+    if num_workers > 1 and len(Bs) > 1:
+        size = len(grid)
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(size * size, 1))
+        try:
+            region = np.ndarray((size, size), np.uint8, buffer=block.buf)
+            region[...] = grid
+            del region
+
+            with ProcessPoolExecutor(
+                    num_workers, initializer=_init_sweep_worker,
+                    initargs=(block.name, size, R, A, C, centers,
+                              max_steps)) as pool:
+                return list(pool.map(_run_sweep_threshold, Bs))
+        finally:
+            block.close()
+            block.unlink()
+
     language_states = []
     
     for B in Bs:
-        new_grid = copy.deepcopy(grid)
+        new_grid = [row[:] for row in grid]
         _, freqs = run_simulation(new_grid, R, (A, B, C), centers, max_steps)
         language_states.append(freqs)
     
     return language_states
 
 
+def engagement_levels(region, R):
+    """
+    Computes the language engagement level of every location at once
+    from a summed-area table, so each window sum costs four lookups
+    instead of (2R + 1)^2 additions.
+
+    Inputs:
+        region (2-D array of ints): the grid
+
+        R (int): the radius of the neighborhood
+
+    Returns (2-D array of floats): the engagement level of each
+    location, the same values engagement_level computes.
+    """
+    size = len(region)
+
+    # table[i][j] holds the sum of region[:i, :j].
+    table = np.zeros((size + 1, size + 1), dtype=np.int64)
+    np.cumsum(np.cumsum(region, axis=0), axis=1, out=table[1:, 1:])
+
+    # The neighborhood of location i spans rows lb[i] to ub[i] - 1, and
+    # likewise for columns.
+    indices = np.arange(size)
+    lb = np.maximum(indices - R, 0)
+    ub = np.minimum(indices + R + 1, size)
+
+    sums = (table[ub[:, None], ub] - table[lb[:, None], ub]
+            - table[ub[:, None], lb] + table[lb[:, None], lb])
+    total_homes = np.outer(ub - lb, ub - lb)
+
+    return sums / total_homes
+
+
+def next_generation_synchronous(region, R, thresholds, covered):
+    """
+    Computes the language state of every location in the next
+    generation at once.  Unlike change_in_step_simulation, which updates
+    the grid in place location by location, so that later locations see
+    the new states of earlier ones, every location here is computed from
+    the states at the start of the step.
+
+    Inputs:
+        region (2-D array of ints): the grid
+
+        R (int): the radius of the neighborhood
+
+        thresholds (tuple): tuple of three floats A, B, C containing
+        the transmission thresholds.
+
+        covered (2-D array of booleans): the locations serviced by a
+        community center (see community_center_coverage)
+
+    Returns (2-D array of ints): the grid for the next generation
+    """
+    A, B, C = thresholds
+    E = engagement_levels(region, R)
+
+    dl = region == 0
+    bilingual = region == 1
+    sl = region == 2
+
+    new_region = region.copy()
+    new_region[dl & (E > B)] = 1
+    new_region[bilingual & covered & (C < E)] = 2
+    new_region[bilingual & ~covered & (E < B)] = 0
+    new_region[bilingual & ~covered & (E >= B) & (C < E)] = 2
+    new_region[sl & ~covered & (E <= A)] = 0
+    new_region[sl & ~covered & (A < E) & (E < B)] = 1
+
+    return new_region
+
+
+def run_simulation_synchronous(grid, R, thresholds, centers, max_steps):
+    """
+    Do the simulation with synchronous updates (see
+    next_generation_synchronous), stopping early once a step changes
+    nothing.  This is a different model from run_simulation and, in
+    general, gives a different final grid.
+
+    Inputs:
+      grid (list of lists of ints): the grid, updated in place
+      R (int): neighborhood radius
+      thresholds (float, float, float): the language
+        state transition thresholds (A, B, C)
+      centers (list of tuples): a list of community centers in the
+        region
+      max_steps (int): maximum number of steps
+
+    Returns (tuple): the grid, the frequency of each language state
+      (int, int, int) and the number of steps taken
+    """
+    region = np.array(grid, dtype=np.int64).reshape(len(grid), len(grid))
+    covered = community_center_coverage(len(grid), centers)
+    number_steps = 0
+
+    while number_steps < max_steps:
+        number_steps += 1
+        new_region = next_generation_synchronous(region, R, thresholds,
+                                                 covered)
+        if np.array_equal(new_region, region):
+            break
+        region = new_region
+
+    grid[:] = region.tolist()
+    home_counts = np.bincount(region.ravel(), minlength=3)
+
+    return grid, tuple(int(count) for count in home_counts), number_steps
+
+
 @click.command(name="language")
 @click.option('--grid_file', type=click.Path(exists=True),
               default="tests/writeup-grid.txt",
@@ -249,7 +881,9 @@ def simulation_sweep(grid, R, A, Bs, C, centers, max_steps):
 @click.option('--c', type=float, default=1.6, help="transition threshold C")
 @click.option('--max_steps', type=int, default=1,
               help="maximum number of simulation steps")
-def cmd(grid_file, r, a, b, c, max_steps):
+@click.option('--synchronous', is_flag=True,
+              help="update every home at once from the previous step")
+def cmd(grid_file, r, a, b, c, max_steps, synchronous):
     '''
     Run the simulation.
     '''
@@ -269,7 +903,19 @@ def cmd(grid_file, r, a, b, c, max_steps):
                 print("   ", center)
 
     # run the simulation
-    frequencies = run_simulation(grid, r, (a, b, c), centers, max_steps)
+    if synchronous:
+        frequencies = run_simulation_synchronous(grid, r, (a, b, c), centers,
+                                                 max_steps)[:2]
+    else:
+        number_steps, cycle_length = simulate_steps(grid, r, (a, b, c),
+                                                    centers, max_steps)
+        frequencies = grid, language_state_frequencies(grid)
+        if cycle_length == 1:
+            print("The region settled; {} of {} steps taken".format(
+                number_steps, max_steps))
+        elif cycle_length is not None:
+            print("The region cycles every {} steps; {} of {} steps "
+                  "taken".format(cycle_length, number_steps, max_steps))
 
     if print_grid:
         print("Final region:")
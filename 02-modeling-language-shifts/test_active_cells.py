@@ -0,0 +1,73 @@
+"""
+CS 121: Language shifts
+
+Test code for the ActiveCells class.
+"""
+
+import os
+import random
+import sys
+import pytest
+
+BASE_DIR = os.path.dirname(__file__)
+TEST_DIR = os.path.join(BASE_DIR, "tests")
+
+# Handle the fact that the grading code may not
+# be in the same directory as language.py
+sys.path.insert(0, os.getcwd())
+
+# Keep pylint from complaining about generated code.
+#pylint: disable-msg=wrong-import-position
+#pylint: disable-msg=missing-docstring
+
+import language
+import utility
+
+
+def check_active_steps(grid, R, thresholds, centers, num_steps):
+    active_grid = [row[:] for row in grid]
+    active = language.ActiveCells(len(grid))
+
+    for _ in range(num_steps):
+        expected = language.change_in_step_simulation(grid, thresholds, R,
+                                                      centers)
+        actual = language.change_in_step_simulation(active_grid, thresholds,
+                                                    R, centers,
+                                                    active=active)
+        assert actual == expected
+        assert active_grid == grid
+
+    return active
+
+
+@pytest.mark.parametrize("filename", ["writeup-grid-with-cc.txt",
+                                      "clustered-speakers.txt",
+                                      "medium-grid.txt", "large-grid.txt"])
+@pytest.mark.parametrize("R", [1, 2, 3])
+@pytest.mark.parametrize("thresholds", [(0.6, 0.8, 1.6), (0.4, 0.6, 1.2)])
+def test_active_cells(filename, R, thresholds):
+    grid, centers = utility.read_grid(os.path.join(TEST_DIR, filename))
+    check_active_steps(grid, R, thresholds, centers, 8)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_active_cells_random(seed):
+    rng = random.Random(seed)
+    size = rng.randrange(1, 15)
+    grid = [[rng.randrange(3) for _ in range(size)] for _ in range(size)]
+    centers = [((rng.randrange(size), rng.randrange(size)), rng.randrange(3))
+               for _ in range(rng.randrange(3))]
+    A = rng.uniform(0, 1)
+    B = rng.uniform(A, 1.5)
+    C = rng.uniform(B, 2)
+
+    check_active_steps(grid, rng.randrange(4), (A, B, C), centers, 10)
+
+
+def test_active_cells_settle():
+    grid, centers = utility.read_grid(os.path.join(TEST_DIR,
+                                                   "large-grid.txt"))
+    active = check_active_steps(grid, 1, (0.6, 0.8, 1.6), centers, 30)
+
+    assert not any(active.row_counts)
+    assert not any(any(row) for row in active.active)
@@ -0,0 +1,85 @@
+"""
+CS 121: Language shifts
+
+Test code for the community_center_coverage function.
+"""
+
+import os
+import random
+import sys
+import pytest
+
+BASE_DIR = os.path.dirname(__file__)
+TEST_DIR = os.path.join(BASE_DIR, "tests")
+
+# Handle the fact that the grading code may not
+# be in the same directory as language.py
+sys.path.insert(0, os.getcwd())
+
+# Keep pylint from complaining about generated code.
+#pylint: disable-msg=wrong-import-position
+#pylint: disable-msg=missing-docstring
+
+import language
+import utility
+
+GRID_FILES = ["writeup-grid.txt", "writeup-grid-with-cc.txt",
+              "clustered-speakers.txt", "mostly-DL.txt", "medium-grid.txt",
+              "large-grid.txt"]
+
+
+def random_centers(size, num_centers, seed):
+    """
+    Generate community centers, some of them partly or wholly outside
+    the grid.
+
+    Inputs:
+      size (int): the number of rows (and columns) in the grid
+      num_centers (int): the number of centers
+      seed (int): the seed for the random number generator
+
+    Returns (list of tuples): the community centers
+    """
+    rng = random.Random(seed)
+
+    return [((rng.randrange(-3, size + 3), rng.randrange(-3, size + 3)),
+             rng.randrange(4))
+            for _ in range(num_centers)]
+
+
+def check_coverage(size, centers):
+    actual = language.community_center_coverage(size, centers)
+    sl_grid = [[2] * size for _ in range(size)]
+
+    for i in range(size):
+        for j in range(size):
+            expected = language.is_sl_within_community_center(
+                sl_grid, centers, (i, j))
+            assert actual[i, j] == expected
+
+
+@pytest.mark.parametrize("filename", GRID_FILES)
+def test_community_center_coverage(filename):
+    grid, centers = utility.read_grid(os.path.join(TEST_DIR, filename))
+    check_coverage(len(grid), centers)
+
+
+@pytest.mark.parametrize("size", [1, 5, 17])
+@pytest.mark.parametrize("num_centers", [0, 1, 40])
+def test_community_center_coverage_random(size, num_centers):
+    check_coverage(size, random_centers(size, num_centers, size * num_centers))
+
+
+@pytest.mark.parametrize("R", [1, 2])
+def test_change_in_step_simulation_coverage(R):
+    grid, _ = utility.read_grid(os.path.join(TEST_DIR, "large-grid.txt"))
+    centers = random_centers(len(grid), 60, R)
+    coverage = language.community_center_coverage(len(grid), centers).tolist()
+    covered_grid = [row[:] for row in grid]
+    thresholds = (0.6, 0.8, 1.6)
+
+    for _ in range(3):
+        language.change_in_step_simulation(grid, thresholds, R, centers)
+        language.change_in_step_simulation(covered_grid, thresholds, R,
+                                           centers, coverage=coverage)
+        assert covered_grid == grid
@@ -0,0 +1,60 @@
+"""
+CS 121: Language shifts
+
+Test code for the EngagementIndex class.
+"""
+
+import os
+import random
+import sys
+import pytest
+
+BASE_DIR = os.path.dirname(__file__)
+TEST_DIR = os.path.join(BASE_DIR, "tests")
+
+# Handle the fact that the grading code may not
+# be in the same directory as language.py
+sys.path.insert(0, os.getcwd())
+
+# Keep pylint from complaining about generated code.
+#pylint: disable-msg=wrong-import-position
+#pylint: disable-msg=missing-docstring
+
+import language
+import utility
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 16, 23])
+@pytest.mark.parametrize("R", [0, 1, 3, 30])
+def test_engagement_index_updates(size, R):
+    rng = random.Random(size * 100 + R)
+    grid = [[rng.randrange(3) for _ in range(size)] for _ in range(size)]
+    index = language.EngagementIndex(grid)
+
+    for _ in range(50):
+        i, j = rng.randrange(size), rng.randrange(size)
+        new_state = rng.randrange(3)
+        index.add((i, j), new_state - grid[i][j])
+        grid[i][j] = new_state
+
+        i, j = rng.randrange(size), rng.randrange(size)
+        assert index.engagement_level((i, j), R) == \
+            language.engagement_level(grid, (i, j), R)
+
+
+@pytest.mark.parametrize("filename", ["writeup-grid-with-cc.txt",
+                                      "medium-grid.txt", "large-grid.txt"])
+@pytest.mark.parametrize("R", [1, 2, 4])
+def test_change_in_step_simulation_index(filename, R):
+    grid, centers = utility.read_grid(os.path.join(TEST_DIR, filename))
+    indexed_grid = [row[:] for row in grid]
+    index = language.EngagementIndex(indexed_grid)
+    thresholds = (0.6, 0.8, 1.6)
+
+    for _ in range(3):
+        language.change_in_step_simulation(grid, thresholds, R, centers)
+        language.change_in_step_simulation(indexed_grid, thresholds, R,
+                                           centers, index)
+        assert indexed_grid == grid
+
+    assert index.prefix_sum(len(grid), len(grid)) == sum(map(sum, grid))
@@ -0,0 +1,106 @@
+"""
+CS 121: Language shifts
+
+Test code for reading and writing grid files.
+"""
+
+import os
+import sys
+import pytest
+
+BASE_DIR = os.path.dirname(__file__)
+TEST_DIR = os.path.join(BASE_DIR, "tests")
+
+# Handle the fact that the grading code may not
+# be in the same directory as utility.py
+sys.path.insert(0, os.getcwd())
+
+# Keep pylint from complaining about generated code.
+#pylint: disable-msg=wrong-import-position
+#pylint: disable-msg=missing-docstring
+
+import language
+import utility
+
+GRID_FILES = ["writeup-grid.txt", "writeup-grid-with-cc.txt",
+              "clustered-speakers.txt", "mostly-DL.txt", "medium-grid.txt",
+              "large-grid.txt"]
+
+
+def read_grid_by_line(filename):
+    """
+    Read a grid the simple way, one value at a time.
+
+    Inputs:
+      filename (string): the name of the grid file
+
+    Returns (tuple): the grid and the community centers
+    """
+    with open(filename) as f:
+        N = int(f.readline())
+        grid = [[int(value) for value in f.readline().split()]
+                for _ in range(N)]
+        num_centers = int(f.readline())
+        centers = []
+        for _ in range(num_centers):
+            i, j, distance = [int(value) for value in f.readline().split()]
+            centers.append(((i, j), distance))
+
+    return grid, centers
+
+
+@pytest.mark.parametrize("filename", GRID_FILES)
+def test_read_grid(filename):
+    filename = os.path.join(TEST_DIR, filename)
+    grid, centers = utility.read_grid(filename)
+
+    assert (grid, centers) == read_grid_by_line(filename)
+    assert all(isinstance(home, int) for row in grid for home in row)
+
+
+@pytest.mark.parametrize("filename", GRID_FILES)
+def test_binary_grid(filename, tmp_path):
+    text_filename = os.path.join(TEST_DIR, filename)
+    binary_filename = str(tmp_path / "grid.bin")
+    utility.convert_grid(text_filename, binary_filename)
+
+    assert utility.is_binary_grid_file(binary_filename)
+    assert not utility.is_binary_grid_file(text_filename)
+    assert utility.read_grid(binary_filename) == \
+        utility.read_grid(text_filename)
+
+
+def test_binary_grid_simulation(tmp_path):
+    text_filename = os.path.join(TEST_DIR, "large-grid.txt")
+    binary_filename = str(tmp_path / "grid.bin")
+    utility.convert_grid(text_filename, binary_filename)
+
+    results = []
+    for filename in (text_filename, binary_filename):
+        grid, centers = utility.read_grid(filename)
+        results.append(language.run_simulation(grid, 2, (0.6, 0.8, 1.6),
+                                               centers, 5))
+
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("contents", ["2\n0 1\n1 3\n0\n", "0\n0\n"])
+def test_read_grid_invalid(contents, tmp_path):
+    filename = str(tmp_path / "grid.txt")
+    with open(filename, "w") as f:
+        f.write(contents)
+
+    with pytest.raises(SystemExit):
+        utility.read_grid(filename)
+
+
+def test_read_binary_grid_truncated(tmp_path):
+    filename = str(tmp_path / "grid.bin")
+    utility.write_binary_grid(filename, [[0, 1], [2, 1]], [((0, 0), 1)])
+    with open(filename, "rb") as f:
+        data = f.read()
+    with open(filename, "wb") as f:
+        f.write(data[:-1])
+
+    with pytest.raises(SystemExit):
+        utility.read_grid(filename)
@@ -0,0 +1,95 @@
+"""
+CS 121: Language shifts
+
+Test code for the run_simulation_synchronous function.
+"""
+
+import os
+import sys
+import pytest
+
+BASE_DIR = os.path.dirname(__file__)
+TEST_DIR = os.path.join(BASE_DIR, "tests")
+
+# Handle the fact that the grading code may not
+# be in the same directory as language.py
+sys.path.insert(0, os.getcwd())
+
+# Keep pylint from complaining about generated code.
+#pylint: disable-msg=wrong-import-position
+#pylint: disable-msg=missing-docstring
+
+import numpy as np
+
+import language
+import utility
+
+GRID_FILES = ["writeup-grid.txt", "writeup-grid-with-cc.txt",
+              "clustered-speakers.txt", "mostly-DL.txt", "medium-grid.txt",
+              "large-grid.txt"]
+
+
+def synchronous_step(grid, R, thresholds, centers):
+    """
+    Take one synchronous step with the pure Python functions: every
+    location is updated in a scratch copy of the grid at the start of
+    the step.
+
+    Inputs:
+      grid (list of lists of ints): the grid
+      R (int): neighborhood radius
+      thresholds (float, float, float): the language
+        state transition thresholds (A, B, C)
+      centers (list of tuples): a list of community centers in the
+        region
+
+    Returns (list of lists of ints): the grid after the step
+    """
+    new_grid = [row[:] for row in grid]
+
+    for i, row in enumerate(grid):
+        for j, _ in enumerate(row):
+            scratch = [row[:] for row in grid]
+            language.transmission_next_generation(scratch, (i, j),
+                                                  thresholds, R, centers)
+            new_grid[i][j] = scratch[i][j]
+
+    return new_grid
+
+
+@pytest.mark.parametrize("filename", GRID_FILES)
+@pytest.mark.parametrize("R", [0, 1, 2, 3, 50])
+def test_engagement_levels(filename, R):
+    grid, _ = utility.read_grid(os.path.join(TEST_DIR, filename))
+
+    actual = language.engagement_levels(np.array(grid), R)
+
+    for i, row in enumerate(grid):
+        for j, _ in enumerate(row):
+            assert actual[i, j] == language.engagement_level(grid, (i, j), R)
+
+
+@pytest.mark.parametrize("filename", GRID_FILES[:5])
+@pytest.mark.parametrize("R, thresholds", [(1, (0.6, 0.8, 1.6)),
+                                           (2, (0.6, 0.8, 1.6)),
+                                           (1, (0.4, 0.6, 1.2))])
+def test_run_simulation_synchronous(filename, R, thresholds):
+    grid, centers = utility.read_grid(os.path.join(TEST_DIR, filename))
+    max_steps = 5
+
+    expected_grid = grid
+    expected_steps = 0
+    while expected_steps < max_steps:
+        expected_steps += 1
+        new_grid = synchronous_step(expected_grid, R, thresholds, centers)
+        if new_grid == expected_grid:
+            break
+        expected_grid = new_grid
+
+    actual_grid, frequencies, steps = language.run_simulation_synchronous(
+        [row[:] for row in grid], R, thresholds, centers, max_steps)
+
+    assert actual_grid == expected_grid
+    assert steps == expected_steps
+    assert frequencies == tuple(sum(row.count(state) for row in expected_grid)
+                                for state in range(3))
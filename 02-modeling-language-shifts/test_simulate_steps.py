@@ -0,0 +1,93 @@
+"""
+CS 121: Language shifts
+
+Test code for the simulate_steps function.
+"""
+
+import os
+import sys
+import pytest
+
+BASE_DIR = os.path.dirname(__file__)
+TEST_DIR = os.path.join(BASE_DIR, "tests")
+
+# Handle the fact that the grading code may not
+# be in the same directory as language.py
+sys.path.insert(0, os.getcwd())
+
+# Keep pylint from complaining about generated code.
+#pylint: disable-msg=wrong-import-position
+#pylint: disable-msg=missing-docstring
+
+import language
+import utility
+
+# Regions whose grids keep cycling, with A > B.
+CYCLING_REGIONS = [
+    ([[1, 1, 1, 2], [1, 2, 2, 2], [2, 2, 0, 2], [0, 1, 2, 1]], 1,
+     (2.4102659661878656, 0.15573273614196026, 0.6301426553042002), []),
+    ([[2, 2, 2, 0, 1], [0, 0, 0, 2, 0], [2, 1, 0, 0, 2], [2, 2, 2, 0, 2],
+      [2, 0, 1, 1, 2]], 1,
+     (1.8870119837006172, 0.6219104339331052, 0.03648706938198587),
+     [((4, 1), 2)]),
+]
+
+
+def step_every_time(grid, R, thresholds, centers, max_steps):
+    """
+    Take all max_steps steps without looking for cycles.
+
+    Returns (list of lists of ints): the final grid
+    """
+    grid = [row[:] for row in grid]
+    for _ in range(max_steps):
+        language.change_in_step_simulation(grid, thresholds, R, centers)
+
+    return grid
+
+
+@pytest.mark.parametrize("region", CYCLING_REGIONS)
+@pytest.mark.parametrize("max_steps", [0, 1, 2, 5, 10, 11, 12, 13, 100, 1001])
+def test_simulate_steps_cycle(region, max_steps):
+    grid, R, thresholds, centers = region
+    expected = step_every_time(grid, R, thresholds, centers, max_steps)
+
+    actual = [row[:] for row in grid]
+    number_steps, cycle_length = language.simulate_steps(
+        actual, R, thresholds, centers, max_steps)
+
+    assert actual == expected
+    assert number_steps <= max_steps
+    if max_steps >= 100:
+        assert cycle_length == 3
+        assert number_steps < 20
+
+
+@pytest.mark.parametrize("filename", ["writeup-grid-with-cc.txt",
+                                      "medium-grid.txt", "large-grid.txt"])
+@pytest.mark.parametrize("R", [1, 2])
+def test_simulate_steps_settles(filename, R):
+    grid, centers = utility.read_grid(os.path.join(TEST_DIR, filename))
+    thresholds = (0.6, 0.8, 1.6)
+    expected = step_every_time(grid, R, thresholds, centers, 60)
+
+    number_steps, cycle_length = language.simulate_steps(
+        grid, R, thresholds, centers, 60)
+
+    assert grid == expected
+    assert cycle_length == 1
+    assert number_steps < 60
+    assert language.run_simulation(grid, R, thresholds, centers, 3) == \
+        (expected, language.language_state_frequencies(expected))
+
+
+@pytest.mark.parametrize("filename", ["writeup-grid-with-cc.txt",
+                                      "medium-grid.txt"])
+def test_grid_hash(filename):
+    grid, centers = utility.read_grid(os.path.join(TEST_DIR, filename))
+    grid_hash = language.GridHash(grid)
+
+    for _ in range(5):
+        language.change_in_step_simulation(grid, (0.6, 0.8, 1.6), 1, centers,
+                                           grid_hash=grid_hash)
+        assert grid_hash.value == language.GridHash(grid).value
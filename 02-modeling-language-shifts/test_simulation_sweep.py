@@ -29,7 +29,8 @@ from language import simulation_sweep
 import test_helpers
 import utility
 
-def helper_test_simulation_sweep(input_filename, R, A, Bs, C, max_steps, expected_frequencies):
+def helper_test_simulation_sweep(input_filename, R, A, Bs, C, max_steps, expected_frequencies,
+                                 num_workers=1):
     """
     Do one simulation with the specified parameters and
       match the actual frequencies with expected frequencies
@@ -45,11 +46,13 @@ def helper_test_simulation_sweep(input_filename, R, A, Bs, C, max_steps, expecte
         region
       max_steps (int): maximum number of steps
       expected_frequencies (list of tuples): the expected frequencies
+      num_workers (int): the number of processes for the sweep
     """
 
     input_filename = os.path.join(TEST_DIR, input_filename)
     actual_grid, centers = utility.read_grid(input_filename)
-    actual_frequencies = simulation_sweep(actual_grid, R, A, Bs, C, centers, max_steps)
+    actual_frequencies = simulation_sweep(actual_grid, R, A, Bs, C, centers, max_steps,
+                                          num_workers)
     
     recreate_msg = "To recreate this test in ipython3 run:\n"
     recreate_msg += "    region, centers = utility.read_grid('{}')\n"
@@ -172,4 +175,16 @@ def test_simulation_sweep_10():
     C = 1.6
     max_steps = 5
     expected_frequencies =  [(0, 1025, 575), (0, 1026, 574), (477, 714, 409), (1496, 55, 49), (1497, 54, 49)]
-    helper_test_simulation_sweep(input_filename, R, A, Bs, C, max_steps, expected_frequencies)
\ No newline at end of file
+    helper_test_simulation_sweep(input_filename, R, A, Bs, C, max_steps, expected_frequencies)
+
+@pytest.mark.parametrize("num_workers", [2, 3])
+def test_simulation_sweep_parallel(num_workers):
+    input_filename = 'large-grid.txt'
+    R = 3
+    A = 0.6
+    Bs = [0.6, 0.8, 1.0, 1.2, 1.4]
+    C = 1.6
+    max_steps = 5
+    expected_frequencies =  [(0, 1024, 576), (0, 1025, 575), (739, 537, 324), (1496, 55, 49), (1497, 54, 49)]
+    helper_test_simulation_sweep(input_filename, R, A, Bs, C, max_steps, expected_frequencies,
+                                 num_workers)
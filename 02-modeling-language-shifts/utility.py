@@ -2,22 +2,134 @@
 CS 121: Language shifts
 
 Utility functions for working with grids.
+
+Example use, to convert a grid to the binary format:
+    $ python3 utility.py tests/large-grid.txt large-grid.grid
 """
 
 import os
+import struct
 import sys
+import click
+import numpy as np
 
 ALLOWED_VALUES = (0, 1, 2)
 
-def read_grid(filename, allowed=ALLOWED_VALUES):
+# Binary grid files start with this magic string, the size of the grid
+# (N) and the number of community centers, as little-endian uint64s.
+# Then come the N x N language states, one byte per home, row by row,
+# and a row, column and distance for every center as little-endian
+# int64s.
+GRID_FILE_MAGIC = b"LANGGRID"
+GRID_FILE_HEADER = struct.Struct("<8sQQ")
+CENTER_DTYPE = np.dtype("<i8")
+
+
+def is_binary_grid_file(filename):
     """
-    Read a grid from a text file.
+    Check whether a file holds a grid in the binary format.
 
     Input:
       filename (string): the name of the grid file
 
-    Returns (tuple): 
-      (list of list of ints): the grid
+    Returns: True if the file starts with GRID_FILE_MAGIC
+    """
+
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(GRID_FILE_MAGIC)) == GRID_FILE_MAGIC
+    except IOError:
+        return False
+
+
+def parse_text_grid(filename):
+    """
+    Parse a grid in the text format with NumPy rather than one value at
+    a time.
+
+    Input:
+      filename (string): the name of the grid file
+
+    Returns (tuple):
+      (2-D array of ints): the grid
+      (list of tuples): the community centers
+    """
+
+    with open(filename) as f:
+        lines = f.read().splitlines()
+
+    N = int(lines[0])
+    if N == 0:
+        print("Empty file")
+        sys.exit(0)
+
+    grid = np.loadtxt(lines[1:N + 1], dtype=np.int64, ndmin=2)
+    assert grid.shape == (N, N), \
+        "Row is the wrong length"
+
+    # get the community centers
+    num_centers = int(lines[N + 1])
+    centers = []
+    if num_centers:
+        table = np.loadtxt(lines[N + 2:N + 2 + num_centers], dtype=np.int64,
+                           usecols=(0, 1, 2), ndmin=2)
+        for i, j, distance in table.tolist():
+            centers.append(((i, j), distance))
+
+    return grid, centers
+
+
+def read_binary_grid(filename):
+    """
+    Load a grid saved in the binary format without reading it: the
+    grid is memory-mapped copy-on-write, so homes are only read from
+    disk as they are used and changes never reach the file.
+
+    Input:
+      filename (string): the name of the grid file
+
+    Returns (tuple):
+      (2-D array of uint8s): the grid
+      (list of tuples): the community centers
+    """
+
+    with open(filename, "rb") as f:
+        header = f.read(GRID_FILE_HEADER.size)
+
+    if len(header) < GRID_FILE_HEADER.size:
+        print("Not a binary grid file:", filename)
+        sys.exit(0)
+    magic, N, num_centers = GRID_FILE_HEADER.unpack(header)
+
+    centers_offset = GRID_FILE_HEADER.size + N * N
+    expected_size = centers_offset + 3 * num_centers * CENTER_DTYPE.itemsize
+    if magic != GRID_FILE_MAGIC or os.path.getsize(filename) != expected_size:
+        print("Not a binary grid file:", filename)
+        sys.exit(0)
+
+    if N == 0:
+        print("Empty file")
+        sys.exit(0)
+
+    grid = np.memmap(filename, dtype=np.uint8, mode="c",
+                     offset=GRID_FILE_HEADER.size, shape=(N, N))
+    table = np.fromfile(filename, dtype=CENTER_DTYPE,
+                        count=3 * num_centers, offset=centers_offset)
+    centers = [((i, j), distance)
+               for i, j, distance in table.reshape(-1, 3).tolist()]
+
+    return grid, centers
+
+
+def read_grid_array(filename, allowed=ALLOWED_VALUES):
+    """
+    Read a grid from a text or binary file into an array.
+
+    Input:
+      filename (string): the name of the grid file
+
+    Returns (tuple):
+      (2-D array of ints): the grid
       (list of tuples): the community centers
     """
 
@@ -25,54 +137,80 @@ def read_grid(filename, allowed=ALLOWED_VALUES):
         print("File not found:" + filename)
         sys.exit(0)
 
-    with open(filename) as f:
-        grid = []
-        centers = []
+    if is_binary_grid_file(filename):
+        grid, centers = read_binary_grid(filename)
+    else:
+        grid, centers = parse_text_grid(filename)
+
+    # check elements in the rows
+    invalid_rows = np.flatnonzero(~np.isin(grid, allowed).all(axis=1))
+    if invalid_rows.size:
+        row = int(invalid_rows[0])
+        print("Row {} has values other than {}".format(
+            row, ",".join(str(value) for value in allowed)))
+        print(row)
+        sys.exit(0)
 
-        # get the grid
-        N = f.readline()
-        N = int(N)
+    # check location of community centers
+    N = len(grid)
+    for ((i, j), _) in centers:
+        if (i < 0) or (j < 0) or (N <= i) or (N <= j):
+            print("Center at invalid location: ({}, {})".format(i, j))
 
-        for row in range(N):
-            line = f.readline()
-            line = line.split()
+    return grid, centers
 
-            for i in range(N):
-                line[i] = int(line[i])
 
-            # check elements in the row
-            if not check_row(N, line, row, allowed):
-                print("Row {} has values other than {}").format(row, ",".join(allowed))
-                print(row)
-                sys.exit(0)
+def read_grid(filename, allowed=ALLOWED_VALUES):
+    """
+    Read a grid from a text file, or a binary file written by
+    write_binary_grid.
 
-            grid.append(line)
+    Input:
+      filename (string): the name of the grid file
 
-        if not grid:
-            print("Empty file")
-            sys.exit(0)
+    Returns (tuple): 
+      (list of list of ints): the grid
+      (list of tuples): the community centers
+    """
 
-        # get the community centers
-        num_centers = f.readline()
-        num_centers = int(num_centers)
+    grid, centers = read_grid_array(filename, allowed)
 
-        for row in range(num_centers):
-            line = f.readline()
-            line = line.split()
+    return grid.tolist(), centers
 
-            i = int(line[0])
-            j = int(line[1])
 
-            # check location of community centers
-            if (i < 0) or (j < 0) or (N <= i) or (N <= i):
-                print("Center at invalid location: ({}, {})".format(i, j))
-            
-            location = (i, j)
-            distance = int(line[2])
+def write_binary_grid(filename, grid, centers):
+    """
+    Write a grid in the binary format.
 
-            centers.append((location, distance))
+    Inputs:
+      filename (string): the name of the grid file
+      grid (list of lists of ints or 2-D array): the grid
+      centers (list of tuples): the community centers
+    """
+
+    grid = np.asarray(grid, dtype=np.uint8)
+    table = np.array([(i, j, distance) for ((i, j), distance) in centers],
+                     dtype=CENTER_DTYPE).reshape(-1, 3)
+
+    with open(filename, "wb") as f:
+        f.write(GRID_FILE_HEADER.pack(GRID_FILE_MAGIC, len(grid),
+                                      len(table)))
+        f.write(np.ascontiguousarray(grid).tobytes())
+        f.write(table.tobytes())
+
+
+def convert_grid(text_filename, binary_filename):
+    """
+    Convert a grid file in the text format to the binary format.
+
+    Inputs:
+      text_filename (string): the name of the text grid file
+      binary_filename (string): the name of the binary grid file
+    """
+
+    grid, centers = read_grid_array(text_filename)
+    write_binary_grid(binary_filename, grid, centers)
 
-    return grid, centers
 
 def print_grid(grid):
     """
@@ -179,4 +317,19 @@ def find_difference(grid1, grid2):
                 return (i, j)
 
     # or return None
-    return None
\ No newline at end of file
+    return None
+
+
+@click.command(name="convert")
+@click.argument("text_filename", type=click.Path(exists=True))
+@click.argument("binary_filename", type=click.Path())
+def cmd(text_filename, binary_filename):
+    """
+    Convert a grid file in the text format to the binary format.
+    """
+
+    convert_grid(text_filename, binary_filename)
+    print("Saved grid to", binary_filename)
+
+if __name__ == "__main__":
+    cmd()